@@ -1,9 +1,209 @@
 import json
+import logging
 import time
+from collections import namedtuple
+from threading import Lock, Thread
 from urllib.parse import urlencode
 
+from cachetools import TTLCache
+
 from host_provider.common.http import Connection, ProviderConnection, JsonResponse
 from host_provider.credentials.azure import CredentialAzure
+from host_provider.settings import AZURE_TOKEN_REFRESH_MARGIN, \
+    AZURE_VM_SIZES_TTL, AZURE_VM_SIZES_PERSIST
+
+
+LOG = logging.getLogger(__name__)
+
+
+class AzureToken(namedtuple("AzureToken", "access_token expires_at")):
+
+    def expires_within(self, seconds):
+        return time.time() + seconds >= self.expires_at
+
+
+class TokenCache(object):
+    """
+        OAuth tokens shared by every AzureConnection of the process, keyed
+        by (tenant, client, scope).
+        A token close to `refresh_margin` seconds from expiring is still
+        served while a single background thread (a greenlet when gevent
+        patches threading) fetches the next one. Only an expired token
+        makes callers wait, and then just one of them fetches it.
+    """
+    EXPIRY_MARGIN = 30
+
+    def __init__(self, refresh_margin=AZURE_TOKEN_REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self._tokens = {}
+        self._key_locks = {}
+        self._refreshing = set()
+        self._lock = Lock()
+
+    def _lock_for(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, Lock())
+
+    def _is_valid(self, token):
+        return token is not None and \
+            not token.expires_within(self.EXPIRY_MARGIN)
+
+    def get(self, key, fetch):
+        token = self._tokens.get(key)
+        if not self._is_valid(token):
+            with self._lock_for(key):
+                token = self._tokens.get(key)
+                if not self._is_valid(token):
+                    token = fetch()
+                    self._tokens[key] = token
+            return token
+
+        if token.expires_within(self.refresh_margin):
+            self._refresh_in_background(key, fetch)
+        return token
+
+    def _refresh_in_background(self, key, fetch):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        refresher = Thread(target=self._refresh, args=(key, fetch))
+        refresher.daemon = True
+        refresher.start()
+
+    def _refresh(self, key, fetch):
+        try:
+            with self._lock_for(key):
+                self._tokens[key] = fetch()
+        except Exception as error:
+            LOG.error("Could not refresh Azure token: {}".format(error))
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._tokens.clear()
+        else:
+            self._tokens.pop(key, None)
+
+
+token_cache = TokenCache()
+
+
+class VmSizeIndex(object):
+
+    def __init__(self, sizes, updated_at=None):
+        self.updated_at = updated_at or time.time()
+        self.sizes = {}
+        for size in sizes:
+            key = (size.get("numberOfCores"), size.get("memoryInMB"))
+            self.sizes.setdefault(key, size)
+
+    def get(self, cpu, memory):
+        return self.sizes.get((cpu, memory))
+
+    def is_stale(self, ttl):
+        return time.time() - self.updated_at >= ttl
+
+
+class VmSizeCatalog(object):
+    """
+        Per (subscription, region) index of the `vmSizes` list, keyed by
+        (numberOfCores, memoryInMB).
+        A stale index keeps answering while a background thread reloads
+        it, and with `persist` the list is also kept in the credential
+        database, so a new worker does not need to download it.
+    """
+
+    def __init__(self, ttl=AZURE_VM_SIZES_TTL, persist=AZURE_VM_SIZES_PERSIST):
+        self.ttl = ttl
+        self.persist = persist
+        self._indexes = {}
+        self._refreshing = set()
+        self._lock = Lock()
+
+    def find(self, credential, cpu, memory, fetch):
+        key = (credential.subscription_id, credential.region)
+        index = self._indexes.get(key)
+        if index is None and self.persist:
+            index = self._load(key, credential)
+
+        fetched = index is None
+        if fetched:
+            index = self._reload(key, credential, fetch)
+        elif index.is_stale(self.ttl):
+            self._refresh_in_background(key, credential, fetch)
+
+        if index is None:
+            return None
+
+        size = index.get(cpu, memory)
+        if size is None and not fetched:
+            # The size may have been added after the index was built
+            index = self._reload(key, credential, fetch)
+            size = index and index.get(cpu, memory)
+        return size
+
+    def _stored_key(self, credential):
+        return {
+            "subscription_id": credential.subscription_id,
+            "region": credential.region
+        }
+
+    def _load(self, key, credential):
+        stored = credential.collection_vm_sizes.find_one(
+            self._stored_key(credential)
+        )
+        if not stored:
+            return None
+        index = VmSizeIndex(stored["sizes"], stored["updated_at"])
+        self._indexes[key] = index
+        return index
+
+    def _reload(self, key, credential, fetch):
+        sizes = fetch()
+        if sizes is None:
+            return None
+
+        index = VmSizeIndex(sizes)
+        self._indexes[key] = index
+        if self.persist:
+            credential.collection_vm_sizes.update_one(
+                self._stored_key(credential),
+                {"$set": {"sizes": sizes, "updated_at": index.updated_at}},
+                upsert=True
+            )
+        return index
+
+    def _refresh_in_background(self, key, credential, fetch):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        refresher = Thread(target=self._refresh, args=(key, credential, fetch))
+        refresher.daemon = True
+        refresher.start()
+
+    def _refresh(self, key, credential, fetch):
+        try:
+            self._reload(key, credential, fetch)
+        except Exception as error:
+            LOG.error("Could not refresh Azure vm sizes: {}".format(error))
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def invalidate(self):
+        self._indexes = {}
+
+
+vm_size_catalog = VmSizeCatalog()
+
+# vmId -> name of the virtual machines seen by AzureProvider
+vm_names = TTLCache(maxsize=4096, ttl=300)
 
 
 class AzureConnection(Connection):
@@ -20,6 +220,7 @@ class AzureConnection(Connection):
         "action_createnic":"subscriptions/{}/resourceGroups/{}/providers/Microsoft.Network/networkInterfaces/{}?api-version={}",
         "action_getnetwork":"subscriptions/{}/resourceGroups/{}/providers/Microsoft.Network/virtualNetworks/{}?api-version={}",
         "action_listvm":"subscriptions/{}/providers/Microsoft.Compute/virtualMachines/?api-version={}&statusOnly={}",
+        "action_listgroupvm":"subscriptions/{}/resourceGroups/{}/providers/Microsoft.Compute/virtualMachines?api-version={}",
         "action_deployvm":"subscriptions/{}/resourceGroups/{}/providers/Microsoft.Compute/virtualMachines/{}?api-version={}",
         "action_destroyvm":"subscriptions/{}/resourceGroups/{}/providers/Microsoft.Compute/virtualMachines/{}?api-version=2020-12-01",
         "action_stopvm":"subscriptions/{}/resourceGroups/{}/providers/Microsoft.Compute/virtualMachines/{}/powerOff?api-version=2020-12-01",
@@ -37,6 +238,8 @@ class AzureConnection(Connection):
         self.__login_resource = None
         self.__subscription_id = None
         self.__endpoint = None
+        self.access_token = None
+        self.expires_at = None
 
     @property
     def subscription_id(self):
@@ -94,8 +297,11 @@ class AzureConnection(Connection):
     def login_resource(self, login_resource):
         self.__login_resource = login_resource
 
-    def _build_credentials(self):
-        credentials = self.credential_cls(self.provider, self.environment, self.engine)
+    def _build_credentials(self, credentials=None):
+        if credentials is None:
+            credentials = self.credential_cls(
+                self.provider, self.environment, self.engine
+            )
         self.key = credentials.access_id
         self.secret = credentials.secret_key
         self.tenant_id = credentials.tenant_id
@@ -105,8 +311,18 @@ class AzureConnection(Connection):
         self.endpoint = credentials.endpoint["url"]
         return credentials
 
+    @property
+    def token_key(self):
+        return self.tenant_id, self.key, self.login_resource
+
     def get_token_from_credentials(self):
-        self._build_credentials()
+        if not self.key:
+            self._build_credentials()
+        token = token_cache.get(self.token_key, self._request_token)
+        self.access_token = token.access_token
+        self.expires_at = token.expires_at
+
+    def _request_token(self):
         conn = self.conn_cls(self.login_host, 443, timeout=self.timeout)
         conn.connect()
         params = urlencode({
@@ -118,8 +334,10 @@ class AzureConnection(Connection):
         headers = {"Content-type": "application/x-www-form-urlencoded"}
         conn.request("POST", "/%s/oauth2/v2.0/token" % self.tenant_id, params, headers)
         resp = self.response_cls(conn.getresponse(), conn)
-        self.access_token = resp.object["access_token"]
-        self.expires_in = resp.object["expires_in"]
+        return AzureToken(
+            resp.object["access_token"],
+            time.time() + int(resp.object["expires_in"])
+        )
 
     def add_default_headers(self, headers):
         headers['Content-Type'] = "application/json"
@@ -134,7 +352,8 @@ class AzureConnection(Connection):
         return super(AzureConnection, self).connect(**kwargs)
 
     def request(self, action, params=None, data=None, headers=None, method='GET', raw=False):
-        if (time.time() + 300) >= int(self.expires_in):
+        if self.expires_at is None or \
+                (time.time() + TokenCache.EXPIRY_MARGIN) >= self.expires_at:
             self.get_token_from_credentials()
 
         return super(AzureConnection, self).request(action, params=params, data=data, headers=headers, method=method, raw=raw)
@@ -0,0 +1,245 @@
+import json
+import logging
+import random
+import time
+from os import path
+from socket import timeout as SocketTimeout
+from threading import Lock
+
+import googleapiclient.discovery
+from cachetools import TTLCache
+from googleapiclient.discovery_cache.base import Cache
+
+from host_provider.settings import GCE_DISCOVERY_PATH, \
+    GCE_OPERATION_TIMEOUT, GCE_BACKOFF_INITIAL, GCE_BACKOFF_MAX, \
+    GCE_IMAGE_LINK_TTL
+
+
+LOG = logging.getLogger(__name__)
+
+
+class DiscoveryDocumentCapture(Cache):
+
+    def __init__(self):
+        self.content = None
+
+    def get(self, url):
+        return None
+
+    def set(self, url, content):
+        self.content = content
+
+
+class DiscoveryDocuments(object):
+    """
+        Parsed discovery documents, loaded once per process.
+        A document is read from `<path>/<name>.<version>.json` when it was
+        vendored there (see `make gce_discovery`), otherwise it is fetched
+        from the discovery service the first time the API is built.
+    """
+
+    def __init__(self, path=GCE_DISCOVERY_PATH):
+        self.path = path
+        self._documents = {}
+
+    def file_for(self, name, version):
+        return path.join(self.path, "{}.{}.json".format(name, version))
+
+    def load(self, name, version):
+        file_name = self.file_for(name, version)
+        if not path.isfile(file_name):
+            return None
+        with open(file_name) as fp:
+            return json.load(fp)
+
+    def build(self, name, version, http=None, credentials=None):
+        key = (name, version)
+        document = self._documents.get(key)
+        if document is None:
+            document = self.load(name, version)
+
+        if document is None:
+            LOG.info("Fetching discovery document for %s %s", name, version)
+            capture = DiscoveryDocumentCapture()
+            service = googleapiclient.discovery.build(
+                name, version,
+                http=http, credentials=credentials, cache=capture
+            )
+            if capture.content:
+                self._documents[key] = json.loads(capture.content)
+            return service
+
+        self._documents[key] = document
+        return googleapiclient.discovery.build_from_document(
+            document, http=http, credentials=credentials
+        )
+
+    def clear(self):
+        self._documents = {}
+
+
+discovery_documents = DiscoveryDocuments()
+
+
+class OperationTimeoutError(Exception):
+    pass
+
+
+class Backoff(object):
+    """
+        Exponential delays with jitter: every delay is picked between half
+        and all of the current step, and the step doubles up to `maximum`.
+    """
+
+    def __init__(self, initial=GCE_BACKOFF_INITIAL, maximum=GCE_BACKOFF_MAX,
+                 factor=2):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+
+    def __iter__(self):
+        step = self.initial
+        while True:
+            yield step / 2 + random.uniform(0, step / 2)
+            step = min(step * self.factor, self.maximum)
+
+
+def poll(check, timeout, backoff=None):
+    """
+        Calls `check` until it returns something truthy and returns it,
+        or returns None when `timeout` seconds have passed.
+    """
+    deadline = time.time() + timeout
+    for delay in backoff or Backoff():
+        result = check()
+        if result:
+            return result
+
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return None
+        time.sleep(min(delay, remaining))
+
+
+class OperationWaiter(object):
+    """
+        Waits for Compute operations to finish.
+        `wait` uses the operations `wait` endpoint, which holds the request
+        until the operation is done (or about two minutes have passed), so
+        the backoff only spaces the calls when it answers early or fails.
+    """
+
+    PENDING = ('PENDING', 'RUNNING')
+
+    def __init__(self, timeout=GCE_OPERATION_TIMEOUT, backoff=None):
+        self.timeout = timeout
+        self.backoff = backoff or Backoff()
+
+    def request_for(self, client, project, operation, region=None,
+                    zone=None):
+        if zone:
+            resource = client.zoneOperations()
+            params = {'zone': zone}
+        elif region:
+            resource = client.regionOperations()
+            params = {'region': region}
+        else:
+            resource = client.globalOperations()
+            params = {}
+
+        return resource.wait(project=project, operation=operation, **params)
+
+    def execute(self, request, operation):
+        try:
+            response = request.execute()
+        except SocketTimeout:
+            LOG.warning('Timeout waiting for operation %s', operation)
+            return None
+
+        if response.get('status') in self.PENDING:
+            LOG.debug(
+                'Operation %s is still %s', operation, response.get('status')
+            )
+            return None
+        return response
+
+    def wait(self, client, project, operation, region=None, zone=None,
+             timeout=None):
+        if not operation:
+            raise EnvironmentError('operation must be provided')
+
+        request = self.request_for(
+            client, project, operation, region=region, zone=zone
+        )
+        response = poll(
+            lambda: self.execute(request, operation),
+            timeout or self.timeout,
+            self.backoff
+        )
+        if response is None:
+            raise OperationTimeoutError(
+                'Error while wait {} operation'.format(operation)
+            )
+        return response
+
+
+operation_waiter = OperationWaiter()
+
+
+class ResourceMemo(object):
+    """
+        Resources already read during one logical operation, so the same
+        instance or address is not fetched twice. It lives as long as the
+        provider, which is built for a single request, and must be cleared
+        whenever an operation changes the resources.
+        Missing resources (None) are never kept.
+    """
+
+    def __init__(self):
+        self._resources = {}
+
+    def get(self, key, fetch):
+        resource = self._resources.get(key)
+        if resource is None:
+            resource = fetch()
+            self.set(key, resource)
+        return resource
+
+    def set(self, key, resource):
+        if resource is not None:
+            self._resources[key] = resource
+
+    def clear(self):
+        self._resources.clear()
+
+    def __len__(self):
+        return len(self._resources)
+
+
+class ImageLinks(object):
+    """
+        Image self links by (project, image), shared by every request.
+        Template images are rarely replaced, the ttl bounds how long a
+        replaced image keeps being used.
+    """
+
+    def __init__(self, ttl=GCE_IMAGE_LINK_TTL, maxsize=128):
+        self._links = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = Lock()
+
+    def get(self, project, image, fetch):
+        key = (project, image)
+        with self._lock:
+            link = self._links.get(key)
+        if link is None:
+            link = fetch()
+            with self._lock:
+                self._links[key] = link
+        return link
+
+    def clear(self):
+        with self._lock:
+            self._links.clear()
+
+
+image_links = ImageLinks()
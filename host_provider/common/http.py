@@ -1,14 +1,21 @@
 import copy
 import json
+import time
+from threading import Lock
 from urllib.parse import urlencode, urlparse, urljoin
-from host_provider.settings import HTTP_PROXY
+from host_provider.settings import HTTP_PROXY, HTTP_POOL_CONNECTIONS, \
+    HTTP_POOL_MAXSIZE, HTTP_POOL_MAX_KEEP_ALIVE, HTTP_MAX_RETRIES
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 __all__ = [
     'ProviderConnection',
     'Connection',
     'Response',
-    'JsonResponse'
+    'JsonResponse',
+    'SessionPool',
+    'session_pool'
 ]
 
 ALLOW_REDIRECTS = 1
@@ -24,6 +31,81 @@ class ResponseError(Exception):
         pass
 
 
+class SessionPool(object):
+    """
+        Keep-alive sessions shared per (host, port, proxy), so consecutive
+        connections to the same endpoint reuse their TLS connections.
+        A session older than `max_keep_alive` seconds is replaced on its
+        next checkout. It is not closed, as other greenlets may still be
+        using it; its connections go away with the last of them.
+    """
+
+    def __init__(self, pool_connections=HTTP_POOL_CONNECTIONS,
+                 pool_maxsize=HTTP_POOL_MAXSIZE,
+                 max_keep_alive=HTTP_POOL_MAX_KEEP_ALIVE,
+                 max_retries=HTTP_MAX_RETRIES):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_keep_alive = max_keep_alive
+        self.max_retries = max_retries
+        self.hits = 0
+        self.misses = 0
+        self._sessions = {}
+        self._lock = Lock()
+
+    def build_session(self, proxy_url=None):
+        retries = Retry(
+            total=self.max_retries,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retries
+        )
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if proxy_url:
+            session.proxies = {
+                'http': proxy_url,
+                'https': proxy_url,
+            }
+        return session
+
+    def get(self, host, port, proxy_url=None):
+        key = (host, port, proxy_url)
+        with self._lock:
+            created_at, session = self._sessions.get(key, (None, None))
+            if session and time.time() - created_at < self.max_keep_alive:
+                self.hits += 1
+                return session
+
+            self.misses += 1
+            session = self.build_session(proxy_url)
+            self._sessions[key] = (time.time(), session)
+            return session
+
+    @property
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'sessions': len(self._sessions)
+        }
+
+    def clear(self):
+        with self._lock:
+            for _, session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+
+session_pool = SessionPool()
+
+
 class BaseProviderConnection(object):
     session = None
 
@@ -38,8 +120,8 @@ class BaseProviderConnection(object):
 
     ca_cert = None
 
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, session=None):
+        self.session = session or requests.Session()
 
     def set_http_proxy(self, proxy_url):
         result = self._parse_proxy_url(proxy_url=proxy_url)
@@ -84,8 +166,10 @@ class ProviderConnection(BaseProviderConnection):
 
         proxy_url = kwargs.pop('proxy_url', http_proxy_url_env)
 
-        BaseProviderConnection.__init__(self)
-        self.session.timeout = kwargs.get('timeout', 60)
+        BaseProviderConnection.__init__(
+            self, session_pool.get(self.host, port, proxy_url)
+        )
+        self.timeout = kwargs.get('timeout') or 60
 
         if proxy_url:
             self.set_http_proxy(proxy_url=proxy_url)
@@ -100,7 +184,8 @@ class ProviderConnection(BaseProviderConnection):
             data=body,
             headers=headers,
             allow_redirects=ALLOW_REDIRECTS,
-            stream=stream
+            stream=stream,
+            timeout=self.timeout
         )
 
     def getresponse(self):
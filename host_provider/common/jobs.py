@@ -0,0 +1,145 @@
+import logging
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Lock, Thread
+
+from host_provider.models import Job, mysql_db
+from host_provider.settings import JOB_WORKERS, JOB_TIMEOUT
+
+
+LOG = logging.getLogger(__name__)
+
+
+class JobPool(object):
+    """
+        Runs long actions (like creating a host) out of the request.
+        At most `max_workers` jobs run at the same time, the others wait
+        as `pending`. The target returns a dict that is saved as the job
+        result, any exception marks the job as `failed`.
+        Queued jobs only live in the worker memory, so `recover` fails the
+        ones a previous worker left unfinished. While the worker lives, its
+        active jobs are touched every `heartbeat` seconds, so they never
+        look abandoned to the workers of other hosts.
+    """
+
+    ACTIVE = (Job.PENDING, Job.RUNNING)
+
+    def __init__(self, max_workers=JOB_WORKERS, timeout=JOB_TIMEOUT,
+                 heartbeat=None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.heartbeat = heartbeat or max(timeout / 4, 1)
+        self._executor = None
+        self._active = set()
+        self._lock = Lock()
+        self._heartbeat_thread = None
+
+    @property
+    def owner(self):
+        return "{}:{}".format(socket.gethostname(), os.getpid())
+
+    @staticmethod
+    def is_running(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def is_orphan(self, job):
+        """
+            Jobs of another host are only known to be lost after `timeout`
+            seconds without changes; on this host, the worker that owns
+            the job must be gone (or be this one, which has just started).
+        """
+        if job.updated_at < datetime.now() - timedelta(seconds=self.timeout):
+            return True
+        hostname, _, pid = (job.owner or '').rpartition(':')
+        if hostname != socket.gethostname() or not pid.isdigit():
+            return False
+        return int(pid) == os.getpid() or not self.is_running(int(pid))
+
+    def recover(self):
+        orphans = [
+            job.id for job in Job.select().where(Job.status << self.ACTIVE)
+            if self.is_orphan(job)
+        ]
+        if orphans:
+            LOG.warning('Failing orphan jobs %s', orphans)
+            Job.update(
+                status=Job.FAILED, error='The worker running it stopped',
+                updated_at=datetime.now()
+            ).where(
+                (Job.id << orphans) & (Job.status << self.ACTIVE)
+            ).execute()
+        return orphans
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def touch(self):
+        with self._lock:
+            active = list(self._active)
+        if active:
+            Job.update(updated_at=datetime.now()).where(
+                (Job.id << active) & (Job.status << self.ACTIVE)
+            ).execute()
+
+    def _beat(self):
+        while True:
+            time.sleep(self.heartbeat)
+            try:
+                self.touch()
+            except Exception:
+                LOG.exception('Could not touch jobs')
+            finally:
+                if not mysql_db.is_closed():
+                    mysql_db.close()
+
+    def start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat_thread is not None:
+                return
+            self._heartbeat_thread = Thread(target=self._beat)
+        self._heartbeat_thread.daemon = True
+        self._heartbeat_thread.start()
+
+    def submit(self, job, target, *args, **kwargs):
+        with self._lock:
+            self._active.add(job.id)
+        self.start_heartbeat()
+        return self.executor.submit(self.run, job.id, target, args, kwargs)
+
+    def run(self, job_id, target, args, kwargs):
+        try:
+            job = Job.get(id=job_id)
+            if not job.start():
+                LOG.warning('Job %s is no longer pending', job_id)
+                return
+            try:
+                result = target(*args, **kwargs)
+            except Exception as e:
+                LOG.exception('Job %s failed', job_id)
+                finished = job.fail(str(e))
+            else:
+                finished = job.finish(**(result or {}))
+            if not finished:
+                LOG.warning('Job %s was failed while it ran', job_id)
+        except Exception:
+            LOG.exception('Could not update job %s', job_id)
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+            if not mysql_db.is_closed():
+                mysql_db.close()
+
+
+job_pool = JobPool()
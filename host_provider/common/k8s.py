@@ -0,0 +1,175 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock, Thread
+
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+
+from host_provider.settings import K8S_INFORMER_RESYNC, \
+    K8S_INFORMER_MAX_PODS, K8S_INFORMER_RETRY_INTERVAL, K8S_INFORMER_MAX
+
+
+LOG = logging.getLogger(__name__)
+
+HTTP_STATUS_GONE = 410
+
+
+class PodInformer(object):
+    """
+        Local copy of the pods of one namespace, kept by a background
+        thread: it lists the pods and then watches their changes, listing
+        them again every `resync` seconds.
+        Only pods held here are answered from memory, anything else must
+        be read from the API. The informer stops on the first error (an
+        expired token, for instance) and a new one is built afterwards.
+    """
+
+    def __init__(self, build_client, namespace, resync=K8S_INFORMER_RESYNC,
+                 max_pods=K8S_INFORMER_MAX_PODS):
+        self.build_client = build_client
+        self.namespace = namespace
+        self.resync = resync
+        self.max_pods = max_pods
+        self.resource_version = None
+        self.synced_at = None
+        self.stopped_at = None
+        self._pods = OrderedDict()
+        self._lock = Lock()
+        self._thread = None
+
+    @property
+    def stopped(self):
+        return self.stopped_at is not None
+
+    @property
+    def is_synced(self):
+        if self.stopped or self.synced_at is None:
+            return False
+        # Events that stopped flowing for a whole period are not trusted
+        return time.time() - self.synced_at < 2 * self.resync
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = Thread(target=self._run, args=())
+            self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        if not self.stopped:
+            self.stopped_at = time.time()
+
+    def _run(self):
+        try:
+            client = self.build_client()
+            while not self.stopped:
+                self.sync(client)
+                self.watch(client)
+        except Exception as e:
+            LOG.warning(
+                'Pod informer for namespace %s stopped: %s', self.namespace, e
+            )
+        finally:
+            self.stop()
+
+    def sync(self, client):
+        pods = client.list_namespaced_pod(self.namespace)
+        with self._lock:
+            self._pods = OrderedDict()
+            for pod in pods.items:
+                self._store(pod)
+            self.resource_version = pods.metadata.resource_version
+            self.synced_at = time.time()
+
+    def watch(self, client):
+        try:
+            for event in watch.Watch().stream(
+                client.list_namespaced_pod, self.namespace,
+                resource_version=self.resource_version,
+                timeout_seconds=self.resync
+            ):
+                if self.stopped:
+                    return
+                self.apply(event['type'], event['object'])
+        except ApiException as e:
+            # The resource version expired, the next sync lists it again
+            if e.status != HTTP_STATUS_GONE:
+                raise
+
+    def apply(self, event_type, pod):
+        with self._lock:
+            if event_type == 'DELETED':
+                self._pods.pop(pod.metadata.name, None)
+            else:
+                self._store(pod)
+            self.resource_version = pod.metadata.resource_version
+
+    def _store(self, pod):
+        name = pod.metadata.name
+        self._pods.pop(name, None)
+        self._pods[name] = pod
+        while len(self._pods) > self.max_pods:
+            self._pods.popitem(last=False)
+
+    def get(self, name):
+        if not self.is_synced:
+            return None
+        with self._lock:
+            return self._pods.get(name)
+
+    def __len__(self):
+        return len(self._pods)
+
+
+class PodInformers(object):
+    """
+        One informer per (endpoint, namespace, token) in the process, so
+        a caller is only answered with what its own token can read. The
+        token is kept hashed. At most `max_informers` are kept, the least
+        recently used one is stopped to make room for a new one.
+        A stopped informer is replaced, but not before `retry_interval`
+        seconds.
+    """
+
+    def __init__(self, retry_interval=K8S_INFORMER_RETRY_INTERVAL,
+                 max_informers=K8S_INFORMER_MAX):
+        self.retry_interval = retry_interval
+        self.max_informers = max_informers
+        self._informers = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, endpoint, namespace, token, build_client):
+        key = (
+            endpoint, namespace,
+            hashlib.sha256(token.encode('utf-8')).hexdigest()
+        )
+        with self._lock:
+            informer = self._informers.pop(key, None)
+            if informer is None or self._can_replace(informer):
+                informer = PodInformer(build_client, namespace)
+            self._informers[key] = informer
+            while len(self._informers) > self.max_informers:
+                _, evicted = self._informers.popitem(last=False)
+                evicted.stop()
+        informer.start()
+        return informer
+
+    def _can_replace(self, informer):
+        if not informer.stopped:
+            return False
+        return time.time() - informer.stopped_at >= self.retry_interval
+
+    def clear(self):
+        with self._lock:
+            for informer in self._informers.values():
+                informer.stop()
+            self._informers.clear()
+
+    def __len__(self):
+        return len(self._informers)
+
+
+pod_informers = PodInformers()
@@ -0,0 +1,149 @@
+import logging
+import time
+from threading import Lock, Thread
+from urllib.parse import urlparse
+
+from requests.auth import HTTPBasicAuth
+
+from dbaas_base_provider.team import TeamClient
+from host_provider.common.http import session_pool
+from host_provider.settings import DBAAS_TEAM_API_URL, USER_DBAAS_API, \
+    PASSWORD_DBAAS_API, TEAM_API_TIMEOUT, TEAM_CACHE_TTL, TEAM_CACHE_MAX_STALE
+
+
+LOG = logging.getLogger(__name__)
+
+
+class TeamNotFoundError(Exception):
+    pass
+
+
+class TeamCache(object):
+    """
+        Team metadata keyed by (api url, team name).
+        A team fetched more than `ttl` seconds ago is still served while a
+        background thread fetches it again, so a slow team API only makes
+        a caller wait the first time a team is asked for, or after its
+        refreshes kept failing for `max_stale` seconds.
+    """
+
+    def __init__(self, ttl=TEAM_CACHE_TTL, max_stale=TEAM_CACHE_MAX_STALE):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._teams = {}
+        self._key_locks = {}
+        self._refreshing = set()
+        self._lock = Lock()
+
+    def _lock_for(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, Lock())
+
+    def _age(self, key):
+        fetched_at, _ = self._teams.get(key, (None, None))
+        if fetched_at is None:
+            return None
+        return time.time() - fetched_at
+
+    def _is_usable(self, key):
+        age = self._age(key)
+        return age is not None and age < self.ttl + self.max_stale
+
+    def get(self, key, fetch):
+        if not self._is_usable(key):
+            with self._lock_for(key):
+                if not self._is_usable(key):
+                    self._teams[key] = (time.time(), fetch())
+            return self._teams[key][1]
+
+        _, team = self._teams[key]
+        if self._age(key) >= self.ttl:
+            self._refresh_in_background(key, fetch)
+        return team
+
+    def _refresh_in_background(self, key, fetch):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        refresher = Thread(target=self._refresh, args=(key, fetch))
+        refresher.daemon = True
+        refresher.start()
+
+    def _refresh(self, key, fetch):
+        try:
+            team = fetch()
+            with self._lock_for(key):
+                self._teams[key] = (time.time(), team)
+        except Exception as error:
+            LOG.error("Could not refresh team {}: {}".format(key, error))
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._teams.clear()
+        else:
+            self._teams.pop(key, None)
+
+
+team_cache = TeamCache()
+
+
+def team_api_get(url, **kwargs):
+    parsed = urlparse(url)
+    session = session_pool.get(
+        '{}://{}'.format(parsed.scheme, parsed.hostname), parsed.port
+    )
+    return session.get(url, timeout=TEAM_API_TIMEOUT, **kwargs)
+
+
+def fetch_dbaas_team(team_name):
+    response = team_api_get(
+        DBAAS_TEAM_API_URL + team_name,
+        verify=False,
+        auth=HTTPBasicAuth(USER_DBAAS_API, PASSWORD_DBAAS_API)
+    )
+    if response.status_code != 200:
+        raise TeamNotFoundError(
+            'Team {} not found. Status: {}'.format(
+                team_name, response.status_code
+            )
+        )
+    return response.json()
+
+
+def get_dbaas_team(team_name):
+    if not DBAAS_TEAM_API_URL:
+        return None
+    try:
+        return team_cache.get(
+            (DBAAS_TEAM_API_URL, team_name),
+            lambda: fetch_dbaas_team(team_name)
+        )
+    except Exception as error:
+        LOG.warning("Could not get team {}: {}".format(team_name, error))
+        return None
+
+
+class CachedTeamClient(TeamClient):
+
+    def fetch_team(self):
+        if not self.api_url:
+            raise Exception('Team API URL not informed.')
+        if not self.team_name:
+            raise Exception('Team name not informed.')
+        response = team_api_get('{}/slug/{}'.format(
+            self.api_url, self.slugify(self.team_name)
+        ))
+        if response.ok:
+            return response.json()
+        raise Exception('Team {} not found.'.format(self.team_name))
+
+    @property
+    def team(self):
+        return team_cache.get(
+            (self.api_url, self.team_name), self.fetch_team
+        )
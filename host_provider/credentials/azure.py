@@ -65,19 +65,6 @@ class CredentialAzure(CredentialBase):
     def before_create_host(self, group):
         self._zone = self._get_zone(group)
 
-    def after_create_host(self, group):
-        existing = self.exist_node(group)
-        if not existing:
-            self.collection_last.update_one(
-                {"latestUsed": True, "environment": self.environment},
-                {"$set": {"zone": self.zone}}, upsert=True
-            )
-
-        self.collection_last.update(
-            {"group": group, "environment": self.environment},
-            {"$set": {"zone": self.zone}}, upsert=True
-        )
-
     def remove_last_used_for(self, group):
         self.collection_last.delete_one({
             "environment": self.environment, "group": group
@@ -85,29 +72,11 @@ class CredentialAzure(CredentialBase):
 
     @property
     def collection_last(self):
-        return self.db["azure_zones_last"]
-
-    def exist_node(self, group):
-        return self.collection_last.find_one({
-            "group": group, "environment": self.environment
-        })
+        return self.collection("azure_zones_last")
 
-    def last_used_zone(self):
-        return self.collection_last.find_one({
-            "latestUsed": True, "environment": self.environment
-        })
-
-    def _get_zone(self, group):
-        exist = self.exist_node(group)
-        if exist:
-            return self.get_next_zone_from(exist["zone"])
-
-        latest_used = self.last_used_zone()
-        if latest_used:
-            return self.get_next_zone_from(latest_used["zone"])
-
-        resp = list(self.zones.keys())
-        return resp[0]
+    @property
+    def collection_vm_sizes(self):
+        return self.collection("azure_vm_sizes")
 
 
 class CredentialAddAzure(CredentialAdd):
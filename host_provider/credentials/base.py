@@ -1,10 +1,248 @@
-from pymongo import MongoClient, ReturnDocument
+import logging
+import os
+import time
+from collections import OrderedDict, namedtuple
+from copy import deepcopy
+from threading import Lock, Thread
+from types import MappingProxyType
+
+from bson import ObjectId
+from cachetools import LRUCache, TTLCache
+from pymongo import ASCENDING, MongoClient, ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
 from host_provider.settings import MONGODB_DB, MONGODB_HOST, MONGODB_PORT, \
-    MONGODB_USER, MONGODB_PWD, MONGO_ENDPOINT
+    MONGODB_USER, MONGODB_PWD, MONGO_ENDPOINT, ZONE_NAMES_TTL, \
+    MONGODB_MAX_POOL_SIZE, MONGODB_MAX_IDLE_TIME_MS, \
+    CREDENTIAL_CHECK_INTERVAL, CREDENTIAL_CHANGE_STREAM, \
+    CREDENTIAL_WATCH_RETRY_INTERVAL
 
 from dbaas_base_provider.baseCredential import BaseCredential
 
 
+class MongoConnections(object):
+    """
+        A single MongoClient (and its connection pool) for the process,
+        shared by every credential, with the collection handles built from
+        it. The client is created on first use, so each gunicorn worker
+        gets its own after the fork, and again if the process id changes.
+    """
+
+    def __init__(self, max_pool_size=MONGODB_MAX_POOL_SIZE,
+                 max_idle_time_ms=MONGODB_MAX_IDLE_TIME_MS):
+        self.max_pool_size = max_pool_size
+        self.max_idle_time_ms = max_idle_time_ms
+        self._client = None
+        self._pid = None
+        self._collections = {}
+        self._lock = Lock()
+
+    def build_client(self):
+        params = {
+            'document_class': OrderedDict,
+            'maxPoolSize': self.max_pool_size,
+            'maxIdleTimeMS': self.max_idle_time_ms,
+            'connect': False,
+        }
+        if MONGO_ENDPOINT is None:
+            params.update({
+                'host': MONGODB_HOST,
+                'port': MONGODB_PORT,
+                'username': MONGODB_USER,
+                'password': MONGODB_PWD
+            })
+            return MongoClient(**params)
+        return MongoClient(MONGO_ENDPOINT, **params)
+
+    @property
+    def client(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._client = self.build_client()
+                    self._collections = {}
+                    self._pid = pid
+        return self._client
+
+    @property
+    def db(self):
+        return self.client[MONGODB_DB]
+
+    def collection(self, name):
+        client = self.client
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = client[MONGODB_DB][name]
+            self._collections[name] = collection
+        return collection
+
+
+mongo_connections = MongoConnections()
+
+
+LOG = logging.getLogger(__name__)
+
+
+def new_version():
+    return ObjectId()
+
+
+class CachedContent(object):
+    """
+        A credential document shared by the process. It must not be
+        changed in place, callers that may change it work on `copy()`.
+    """
+
+    def __init__(self, content, checked_at):
+        self.content = content
+        self.checked_at = checked_at
+        self._derived = {}
+
+    def copy(self):
+        return deepcopy(self.content)
+
+    def derived(self, key, build):
+        """
+            Something built from the document (like a zone index), built
+            once and kept as long as the document.
+        """
+        value = self._derived.get(key)
+        if value is None:
+            value = self._derived[key] = build()
+        return value
+
+    @property
+    def version(self):
+        return self.content.get('version')
+
+
+class CredentialContents(object):
+    """
+        Credential documents by (provider, environment), shared by every
+        credential of the process.
+        A document is trusted for `check_interval` seconds, then only its
+        `version` is read again and the whole document is reloaded when it
+        changed. Writes made by the API set a new version; documents
+        without one are reloaded on every check.
+        With `change_stream` on, a change stream on the credentials
+        collection drops changed documents right away and the checks are
+        skipped while it is open. Where change streams are not available
+        (a standalone mongod, for instance) it falls back to the checks and
+        tries again after `retry_interval` seconds.
+        `get` answers the shared `CachedContent`, `stats` how often it was
+        found here (`hits`) or read from the database (`misses`).
+    """
+
+    def __init__(self, check_interval=CREDENTIAL_CHECK_INTERVAL,
+                 change_stream=CREDENTIAL_CHANGE_STREAM,
+                 retry_interval=CREDENTIAL_WATCH_RETRY_INTERVAL, maxsize=128):
+        self.check_interval = check_interval
+        self.change_stream = change_stream
+        self.retry_interval = retry_interval
+        self.hits = 0
+        self.misses = 0
+        self.watching = False
+        self._watch_started_at = None
+        self._contents = LRUCache(maxsize=maxsize)
+        self._lock = Lock()
+
+    def get(self, collection, provider, environment):
+        if self.change_stream:
+            self.start_watch(collection)
+
+        key = (provider, environment)
+        query = {'provider': provider, 'environment': environment}
+        with self._lock:
+            cached = self._contents.get(key)
+        if cached is not None and self.is_current(collection, query, cached):
+            with self._lock:
+                self.hits += 1
+            return cached
+
+        checked_at = time.time()
+        content = collection.find_one(query)
+        cached = None
+        if content is not None:
+            cached = CachedContent(content, checked_at)
+        with self._lock:
+            self.misses += 1
+            if cached is None:
+                self._contents.pop(key, None)
+            else:
+                self._contents[key] = cached
+        return cached
+
+    def is_current(self, collection, query, cached):
+        now = time.time()
+        if self.watching or now - cached.checked_at < self.check_interval:
+            return True
+        if cached.version is None:
+            return False
+
+        current = collection.find_one(query, {'version': True})
+        if current is None or current.get('version') != cached.version:
+            return False
+        cached.checked_at = now
+        return True
+
+    def start_watch(self, collection):
+        with self._lock:
+            started_at = self._watch_started_at
+            if started_at is not None and (
+                self.watching or
+                time.time() - started_at < self.retry_interval
+            ):
+                return
+            self._watch_started_at = time.time()
+
+        thread = Thread(target=self._watch, args=(collection,))
+        thread.daemon = True
+        thread.start()
+
+    def _watch(self, collection):
+        try:
+            with collection.watch() as stream:
+                # Documents read before the stream opened may be stale
+                self.clear()
+                self.watching = True
+                for change in stream:
+                    self.apply(change)
+        except Exception as e:
+            LOG.warning('Credential change stream stopped: %s', e)
+        finally:
+            self.watching = False
+
+    def apply(self, change):
+        document_id = change.get('documentKey', {}).get('_id')
+        with self._lock:
+            for key, cached in list(self._contents.items()):
+                if cached.content.get('_id') == document_id:
+                    self._contents.pop(key, None)
+
+    def invalidate(self, provider, environment=None):
+        with self._lock:
+            for key in list(self._contents.keys()):
+                if key[0] != provider:
+                    continue
+                if environment is None or key[1] == environment:
+                    self._contents.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._contents.clear()
+
+    @property
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'documents': len(self._contents)
+        }
+
+
+credential_contents = CredentialContents()
+
+
 class CredentialMongoDB(BaseCredential):
 
     provider_type = "host_provider"
@@ -21,6 +259,25 @@ class CredentialMongoDB(BaseCredential):
         self.MONGODB_PWD = MONGODB_PWD
         self.MONGODB_DB = MONGODB_DB
 
+    @property
+    def db(self):
+        if self._db is None:
+            return mongo_connections.db
+        return self._db
+
+    def collection(self, name):
+        if self._db is None:
+            return mongo_connections.collection(name)
+        return self._db[name]
+
+    @property
+    def credential(self):
+        if self._collection_credential is None:
+            self._collection_credential = self.collection(
+                self._credential_idx
+            )
+        return self._collection_credential
+
 
 class CredentialBase(CredentialMongoDB):
 
@@ -28,13 +285,21 @@ class CredentialBase(CredentialMongoDB):
         super(CredentialBase, self).__init__(provider, environment)
         self.engine = engine
         self._zone = None
+        # Zone taken by `_get_zone`, kept or given back after the create
+        self._allocation = None
+        self._indexed_zones = None
+        self._indexed_for = None
+        # (content copy, CachedContent it was copied from)
+        self._shared_content = None
 
     def get_content(self):
-        content = self.credential.find_one({
-            "provider": self.provider,
-            "environment": self.environment,
-        })
-        if content:
+        cached = credential_contents.get(
+            self.credential, self.provider, self.environment
+        )
+        if cached and cached.content:
+            # Providers may change their content, the shared one must not
+            content = cached.copy()
+            self._shared_content = (content, cached)
             return content
 
         raise NotImplementedError("No {} credential for {}".format(
@@ -54,43 +319,55 @@ class CredentialBase(CredentialMongoDB):
         pass
 
     def after_create_host(self, group):
-        existing = self.exist_node(group)
-        if not existing:
-            self.collection_last.update_one(
-                {"latestUsed": True, "environment": self.environment},
-                {"$set": {"zone": self.zone}}, upsert=True
-            )
+        allocation, self._allocation = self._allocation, None
+        if self._zone is None:
+            return
+        if allocation is None or allocation.zone != self._zone:
+            self.zone_allocator.record(group, self._zone)
+
+    def release_zone(self, group):
+        allocation, self._allocation = self._allocation, None
+        if allocation is not None:
+            self.zone_allocator.release(allocation)
 
-        self.collection_last.update(
-            {"group": group, "environment": self.environment},
-            {"$set": {"zone": self.zone}}, upsert=True
+    @property
+    def zone_allocator(self):
+        return ZoneAllocator(
+            self.collection_last, self.environment, self._zone_index
         )
 
+    def _get_zone(self, group):
+        self._allocation = self.zone_allocator.allocate(group)
+        return self._allocation.zone
+
     @property
     def _zones_field(self):
         raise NotImplementedError
 
-    def __get_zones(self, **filters):
-        all_zones = self._zones_field
-        filtered_zones = {}
-        for zone_key in all_zones.keys():
-            zone_val = all_zones[zone_key]
-            valid = True
-            for key, value in filters.items():
-                if zone_val[key] != value:
-                    valid = False
-                    break
-            if valid:
-                filtered_zones[zone_key] = zone_val
-        return filtered_zones
+    @property
+    def _zone_index(self):
+        zones = self._zones_field
+        if self._indexed_zones is None or self._indexed_for is not zones:
+            self._indexed_zones = self._build_zone_index(zones)
+            self._indexed_for = zones
+        return self._indexed_zones
+
+    def _build_zone_index(self, zones):
+        content, cached = self._shared_content or (None, None)
+        if cached is None or content is not self._content:
+            return ZoneIndex(zones)
+        # Shared by every credential using the same cached document
+        return cached.derived(
+            (type(self), 'zone_index'), lambda: ZoneIndex(zones)
+        )
 
     @property
     def all_zones(self):
-        return self.__get_zones()
+        return self._zone_index.all_zones
 
     @property
     def zones(self):
-        return self.__get_zones(active=True)
+        return self._zone_index.active_zones
 
     @property
     def zone(self):
@@ -98,21 +375,23 @@ class CredentialBase(CredentialMongoDB):
 
     @zone.setter
     def zone(self, zone):
-        zones = list(self.__get_zones(name=zone).keys())
-        self._zone = zones[0]
+        self._zone = self._zone_index.key_by_name[zone]
 
     def zone_by_id(self, zone_id):
         if not zone_id:
             return None
-        zones = self.__get_zones(id=zone_id)
-        zone_id, values = zones.popitem()
-        return values['name']
+        return self._zone_index.name_by_id[zone_id]
+
+    @property
+    def zone_names_by_id(self):
+        return dict(self._zone_index.name_by_id)
 
     def get_next_zone_from(self, zone_name, increment=0):
-        zones = list(self.zones.keys())
+        index = self._zone_index
+        zones = index.active_keys
         try:
-            base_index = zones.index(zone_name)
-        except ValueError:
+            base_index = index.active_positions[zone_name]
+        except (KeyError, TypeError):
             next_index = increment
         else:
             next_index = base_index + increment + 1
@@ -121,6 +400,178 @@ class CredentialBase(CredentialMongoDB):
         return zones[next_index]
 
 
+class ZoneIndex(object):
+    """
+        Lookups over the zones of a credential, built once for each
+        zones document. Replacing the credential content gives a new
+        document, and so a new index; the document itself is not expected
+        to change in place.
+    """
+
+    def __init__(self, zones):
+        self.all_zones = MappingProxyType(OrderedDict(zones))
+        self.active_zones = MappingProxyType(OrderedDict(
+            (key, zone) for key, zone in zones.items()
+            if zone.get('active') == True  # noqa: E712
+        ))
+        self.active_keys = tuple(self.active_zones.keys())
+        self.active_positions = {
+            key: position for position, key in enumerate(self.active_keys)
+        }
+        self.key_by_name = {}
+        self.name_by_id = {}
+        for key, zone in zones.items():
+            self.key_by_name.setdefault(zone.get('name'), key)
+            if 'id' in zone:
+                self.name_by_id[zone['id']] = zone['name']
+
+
+ZoneAllocation = namedtuple('ZoneAllocation', 'group count position zone')
+
+
+class ZoneAllocator(object):
+    """
+        Round robin over the active zones of an environment, kept in the
+        provider `*_zones_last` collection, one document per group and one
+        per environment (`latestUsed`), unique by (group, environment).
+        A document counts the zones it gave (`count`) from the position of
+        its first one (`base`), so a zone is taken by a single $inc, an
+        upsert for a new group, and concurrent creates never get the same
+        position. A new group starts after the last zone given in the
+        environment. Documents written before counts were kept start after
+        their `zone`.
+    """
+
+    _indexed = set()
+    _indexed_lock = Lock()
+
+    def __init__(self, collection, environment, zone_index):
+        self.collection = collection
+        self.environment = environment
+        self.zone_index = zone_index
+
+    def ensure_index(self):
+        name = self.collection.full_name
+        with self._indexed_lock:
+            if name in self._indexed:
+                return
+            self._indexed.add(name)
+
+        try:
+            self.collection.create_index(
+                [("group", ASCENDING), ("environment", ASCENDING)],
+                unique=True
+            )
+        except PyMongoError as e:
+            LOG.warning('Could not index %s: %s', name, e)
+
+    def zone_at(self, position):
+        zones = self.zone_index.active_keys
+        if not zones:
+            raise Exception("No zone available")
+        return zones[position % len(zones)]
+
+    def _position_after(self, zone):
+        return self.zone_index.active_positions.get(zone, -1) + 1
+
+    def _query(self, group):
+        return {"group": group, "environment": self.environment}
+
+    def _upsert(self, method, *args, **kw):
+        try:
+            return method(*args, upsert=True, **kw)
+        except DuplicateKeyError:
+            # Inserted by a concurrent create, it is found this time
+            return method(*args, upsert=True, **kw)
+
+    def _take(self, query, base=None):
+        update = {"$inc": {"count": 1}}
+        if base is None:
+            document = self.collection.find_one_and_update(
+                query, update, return_document=ReturnDocument.AFTER
+            )
+        else:
+            update["$setOnInsert"] = {"base": base}
+            document = self._upsert(
+                self.collection.find_one_and_update, query, update,
+                return_document=ReturnDocument.AFTER
+            )
+        if document is not None and "base" not in document:
+            document["base"] = self._position_after(document.get("zone"))
+            self.collection.update_one(
+                dict(query, base={"$exists": False}),
+                {"$set": {"base": document["base"]}}
+            )
+        return document
+
+    def _allocation(self, group, count, position):
+        return ZoneAllocation(group, count, position, self.zone_at(position))
+
+    def _environment_position(self):
+        document = self._take(
+            {"latestUsed": True, "environment": self.environment}, 0
+        )
+        return document["base"] + document["count"] - 1
+
+    def allocate(self, group):
+        self.ensure_index()
+        query = self._query(group)
+        document = self._take(query)
+        if document is None:
+            document = self._take(query, self._environment_position())
+
+        count = document["count"]
+        return self._allocation(group, count, document["base"] + count - 1)
+
+    def advance(self, allocation, increment):
+        """
+            Moves an allocation `increment` zones forward, for creates that
+            skip zones. The group count only grows, allocations made
+            meanwhile are kept.
+        """
+        if not increment:
+            return allocation
+
+        count = allocation.count + increment
+        self.collection.update_one(
+            self._query(allocation.group), {"$max": {"count": count}}
+        )
+        return self._allocation(
+            allocation.group, count, allocation.position + increment
+        )
+
+    def release(self, allocation):
+        """
+            Gives the zone back after a failed create, unless the group
+            allocated another zone meanwhile.
+        """
+        self.collection.update_one(
+            dict(self._query(allocation.group), count=allocation.count),
+            {"$inc": {"count": -1}}
+        )
+
+    def record(self, group, zone):
+        """
+            The group got `zone` some other way (given by the caller, or
+            where an existing host was), its next zone follows it. For a
+            new group the environment moves past it as well.
+        """
+        self.ensure_index()
+        update = {"$set": {
+            "zone": zone, "count": 1, "base": self._position_after(zone) - 1
+        }}
+        previous = self._upsert(
+            self.collection.find_one_and_update, self._query(group), update,
+            return_document=ReturnDocument.BEFORE
+        )
+        if previous is None:
+            self._upsert(
+                self.collection.update_one,
+                {"latestUsed": True, "environment": self.environment},
+                update
+            )
+
+
 class CredentialAdd(CredentialMongoDB):
 
     def __init__(self, provider, environment, content):
@@ -135,7 +586,8 @@ class CredentialAdd(CredentialMongoDB):
             },
             {'$set': {
                 'provider': self.provider,
-                'environment': self.environment, **self.content
+                'environment': self.environment, **self.content,
+                'version': new_version()
             }},
             upsert=True,
             return_document=ReturnDocument.AFTER
@@ -148,3 +600,51 @@ class CredentialAdd(CredentialMongoDB):
 
     def is_valid(self, content):
         raise NotImplementedError
+
+
+class ZoneNames(object):
+    """
+        Zone id to zone name of every (provider, environment), read from
+        the credential at most once per ttl, so serializing a host does
+        not load its credential.
+    """
+
+    def __init__(self, ttl=ZONE_NAMES_TTL, maxsize=64):
+        self._names = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = Lock()
+
+    def load(self, provider, environment):
+        from host_provider.providers import get_provider_to
+        provider_cls = get_provider_to(provider)
+        credential = provider_cls(environment, None, None).credential
+        return credential.zone_names_by_id
+
+    def names_for(self, provider, environment):
+        key = (provider, environment)
+        with self._lock:
+            names = self._names.get(key)
+        if names is None:
+            names = self.load(provider, environment)
+            with self._lock:
+                self._names[key] = names
+        return names
+
+    def name_of(self, provider, environment, zone_id):
+        if not zone_id:
+            return None
+        return self.names_for(provider, environment).get(zone_id)
+
+    def invalidate(self, provider, environment=None):
+        with self._lock:
+            for key in list(self._names.keys()):
+                if key[0] != provider:
+                    continue
+                if environment is None or key[1] == environment:
+                    self._names.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._names.clear()
+
+
+zone_names = ZoneNames()
@@ -47,15 +47,23 @@ class CredentialCloudStack(CredentialBase):
 
     def before_create_host(self, group):
         used_zones = set([host.zone for host in Host.filter(group=group)])
+        allocator = self.zone_allocator
+        allocation = allocator.allocate(group)
         while True:
             if self.already_tried_all_zones:
+                allocator.release(allocation)
                 raise Exception("No zone available")
-            zone = self._get_zone(group)
+            zone = allocator.zone_at(
+                allocation.position + self._zone_increment
+            )
             if self._used_all_available_zones(used_zones):
                 break
             if not self._zone_already_used(zone, used_zones):
                 break
             self._zone_increment += 1
+        self._allocation = allocator.advance(
+            allocation, self._zone_increment
+        )
         self._zone_increment += 1
         self._zone = zone
 
@@ -66,32 +74,7 @@ class CredentialCloudStack(CredentialBase):
 
     @property
     def collection_last(self):
-        return self.db["cloudstack_zones_last"]
-
-    def exist_node(self, group):
-        return self.collection_last.find_one({
-            "group": group, "environment": self.environment
-        })
-
-    def last_used_zone(self):
-        return self.collection_last.find_one({
-            "latestUsed": True, "environment": self.environment
-        })
-
-    def _get_zone(self, group):
-        exist = self.exist_node(group)
-        if exist:
-            return self.get_next_zone_from(exist["zone"], self._zone_increment)
-
-        latest_used = self.last_used_zone()
-        if latest_used:
-            return self.get_next_zone_from(
-                latest_used["zone"],
-                self._zone_increment
-            )
-
-        zones = list(self.zones.keys())
-        return self.get_next_zone_from(zones[0], self._zone_increment)
+        return self.collection("cloudstack_zones_last")
 
     @property
     def networks(self):
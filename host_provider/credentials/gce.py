@@ -60,29 +60,7 @@ class CredentialGce(CredentialBase):
 
     @property
     def collection_last(self):
-        return self.db["gcp_zones_last"]
-
-    def exist_node(self, group):
-        return self.collection_last.find_one({
-            "group": group, "environment": self.environment
-        })
-
-    def last_used_zone(self):
-        return self.collection_last.find_one({
-            "latestUsed": True, "environment": self.environment
-        })
-
-    def _get_zone(self, group):
-        exist = self.exist_node(group)
-        if exist:
-            return self.get_next_zone_from(exist["zone"])
-
-        latest_used = self.last_used_zone()
-        if latest_used:
-            return self.get_next_zone_from(latest_used["zone"])
-
-        resp = list(self.zones.keys())
-        return resp[0]
+        return self.collection("gcp_zones_last")
 
     @property
     def pubsub(self):
@@ -0,0 +1,49 @@
+import sys
+import timeit
+from host_provider.models import Host, IP, mysql_db
+
+
+def hot_queries(host):
+    return (
+        ('host by group',
+         Host.select(Host.identifier).where(Host.group == host.group)),
+        ('host by identifier',
+         Host.select().where(Host.identifier == host.identifier)),
+        ('host by id and environment',
+         Host.select().where(
+             (Host.id == host.id) & (Host.environment == host.environment)
+         )),
+        ('ip by name', IP.select().where(IP.name == host.name)),
+        ('ip by host', IP.select().where(IP.host == host.id)),
+    )
+
+
+def explain(query):
+    sql, params = query.sql()
+    cursor = mysql_db.execute_sql('EXPLAIN ' + sql, params)
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def main(number=100):
+    """
+    Shows the plan and the mean time of the queries the API runs the most,
+    using the first host of the table as sample. Run it before and after
+    `make db_migrate` to compare.
+    """
+    host = Host.select().first()
+    if host is None:
+        print('No host to use as sample')
+        return
+
+    for title, query in hot_queries(host):
+        elapsed = timeit.timeit(lambda: list(query.clone()), number=number)
+        print('{}: {:.3f} ms'.format(title, elapsed * 1000 / number))
+        for plan in explain(query):
+            print('    table={table} type={type} key={key} rows={rows}'.format(
+                **plan
+            ))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
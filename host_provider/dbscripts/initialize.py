@@ -1,7 +1,7 @@
 from peewee import MySQLDatabase
 from host_provider.settings import MYSQL_PARAMS
 from host_provider.settings import LOGGING_LEVEL
-from host_provider.models import Host, IP
+from host_provider.models import Host, IP, Job
 import logging
 
 logging.basicConfig(level=LOGGING_LEVEL)
@@ -20,6 +20,7 @@ def try_create_table(model):
 def main():
     try_create_table(Host)
     try_create_table(IP)
+    try_create_table(Job)
 
 if __name__ == "__main__":
     main()
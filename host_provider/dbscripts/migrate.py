@@ -3,12 +3,31 @@ from playhouse.migrate import migrate, MySQLMigrator
 from peewee import BooleanField
 from host_provider.settings import MYSQL_PARAMS
 from host_provider.settings import LOGGING_LEVEL
+from host_provider.models import Job
 import logging
 
 logging.basicConfig(level=LOGGING_LEVEL)
 mysql_db = MySQLDatabase(**MYSQL_PARAMS)
 migrator = MySQLMigrator(mysql_db)
 
+# Same names peewee gives to the `index=True` fields of the models
+INDEXES = (
+    ('host', 'group'),
+    ('host', 'identifier'),
+    ('ip', 'name'),
+)
+
+
+def add_index_online(table, column):
+    """
+    InnoDB builds the index in place, without locking the table for
+    reads or writes while it runs.
+    """
+    mysql_db.execute_sql(
+        'ALTER TABLE `{table}` ADD INDEX `{table}_{column}` (`{column}`), '
+        'ALGORITHM=INPLACE, LOCK=NONE'.format(table=table, column=column)
+    )
+
 
 def main():
     """
@@ -30,6 +49,19 @@ def main():
     except Exception as e:
         logging.error(e)
 
+    try:
+        logging.info("Create 'Job' table")
+        Job.create_table(fail_silently=True)
+    except Exception as e:
+        logging.error(e)
+
+    for table, column in INDEXES:
+        try:
+            logging.info("Add index on '{}.{}'".format(table, column))
+            add_index_online(table, column)
+        except Exception as e:
+            logging.error(e)
+
 
 if __name__ == "__main__":
     main()
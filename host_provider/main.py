@@ -1,16 +1,22 @@
 import json
 import logging
+import os
 from traceback import print_exc
 from bson import json_util, ObjectId
-from flask import Flask, request, jsonify, make_response
+from flask import Flask, request, jsonify, make_response, g
 from flask_cors import CORS
 from flask_httpauth import HTTPBasicAuth
 from raven.contrib.flask import Sentry
 from host_provider.settings import APP_USERNAME, APP_PASSWORD, SENTRY_DSN
 from host_provider.settings import LOGGING_LEVEL
-from host_provider.credentials.base import CredentialAdd
-from host_provider.providers import get_provider_to
-from host_provider.models import Host, IP
+from host_provider.credentials.base import CredentialAdd, zone_names, \
+    credential_contents, new_version
+from host_provider.providers import get_provider_to, provider_name_of, \
+    registered_providers
+from host_provider.providers.cache import ProviderCache
+from host_provider.common.http import session_pool
+from host_provider.common.jobs import job_pool
+from host_provider.models import Host, IP, Job, mysql_db
 
 from dbaas_base_provider.log import log_this
 
@@ -23,6 +29,7 @@ if SENTRY_DSN:
     sentry = Sentry(app, dsn=SENTRY_DSN)
 
 logging.basicConfig(level=LOGGING_LEVEL)
+provider_cache = ProviderCache()
 
 @auth.verify_password
 def verify_password(username, password):
@@ -36,7 +43,39 @@ def verify_password(username, password):
 
 def build_provider(provider_name, env, engine):
     provider_cls = get_provider_to(provider_name)
-    return provider_cls(env, engine, dict(request.headers))
+    provider = provider_cache.build(
+        provider_cls, env, engine, dict(request.headers)
+    )
+    g.setdefault('providers', []).append(provider)
+    return provider
+
+
+def invalidate_credential(provider_name, env=None):
+    provider_cache.invalidate(provider_name, env)
+    zone_names.invalidate(provider_name, env)
+    credential_contents.invalidate(provider_name, env)
+
+
+@app.before_first_request
+def recover_jobs():
+    try:
+        job_pool.recover()
+    except Exception as e:
+        logging.warning('Could not recover jobs: %s', e)
+
+
+@app.teardown_request
+def release_providers(exception=None):
+    for provider in g.pop('providers', []):
+        provider.release()
+
+
+@app.teardown_request
+def release_database(exception=None):
+    # The connection is checked out from the pool on the first query
+    if not mysql_db.is_closed():
+        mysql_db.close()
+
 
 @app.route(
     "/<string:provider_name>/<string:env>/prepare", methods=['POST']
@@ -72,45 +111,90 @@ def create_host(provider_name, env):
     engine = data.get("engine", None)
     cpu = data.get("cpu", None)
     memory = data.get("memory", None)
-    zone = data.get("zone", None)
-    team_name = data.get("team_name", None)
-    database_name = data.get("database_name", "")
-    static_ip_id = data.get("static_ip_id", "")
-    service_account = data.get("service_account", "")
-    ingress_network_tag = data.get("ingress_network_tag", "")
 
     # TODO improve validation and response
     if not (group and name and engine and cpu and memory):
         return response_invalid_request("invalid data {}".format(data))
 
+    if data.get("async", False):
+        try:
+            provider = build_provider(provider_name, env, engine)
+            # Fails here, not in the job, when there is no credential
+            provider.credential.content
+        except Exception as e:
+            return response_invalid_request(str(e))
+
+        job = Job(
+            action='create_host', provider=provider_name, environment=env,
+            owner=job_pool.owner
+        )
+        job.save()
+        job_pool.submit(
+            job, create_host_job,
+            provider_name, env, engine, dict(request.headers), data
+        )
+        return response_created(status_code=202, job_id=job.id)
+
     provider = build_provider(provider_name, env, engine)
+    try:
+        host_obj = _create_host(provider, env, data)
+    except Exception as e:
+        return response_invalid_request(str(e))
+    return response_created(address=host_obj.address, id=host_obj.id)
+
+
+def create_host_job(provider_name, env, engine, auth_info, data):
+    provider_cls = get_provider_to(provider_name)
+    provider = provider_cache.build(provider_cls, env, engine, auth_info)
+    try:
+        host_obj = _create_host(provider, env, data)
+    finally:
+        provider.release()
+    return {'address': host_obj.address, 'id': host_obj.id}
+
+
+def _create_host(provider, env, data):
+    static_ip_id = data.get("static_ip_id", "")
     extra_params = {
-        'team_name': team_name,
-        'database_name': database_name,
+        'team_name': data.get("team_name", None),
+        'database_name': data.get("database_name", ""),
         'port': data.get('port', None),
         'volume_name': data.get('volume_name', None),
         'node_ip': data.get('node_ip', ''),
         'init_user': data.get('init_user', ''),
         'init_password': data.get('init_password', ''),
         'static_ip_id': static_ip_id,
-        'service_account': service_account,
-        'ingress_network_tag': ingress_network_tag,
+        'service_account': data.get("service_account", ""),
+        'ingress_network_tag': data.get("ingress_network_tag", ""),
     }
 
     for attempt in range(provider.create_attempts):
         try:
             created_host_metadata = provider.create_host(
-                cpu, memory, name, group, zone, **extra_params
+                data["cpu"], data["memory"], data["name"], data["group"],
+                data.get("zone", None), **extra_params
             )
             host_obj = provider.create_host_object(
                 provider, data, env, created_host_metadata, static_ip_id
             )
             provider.associate_ip_with_host(host_obj, static_ip_id)
-            return response_created(address=host_obj.address, id=host_obj.id)
-        except Exception as e:
+            return host_obj
+        except Exception:
             print_exc()
             if attempt == provider.create_attempts - 1:
-                return response_invalid_request(str(e))
+                raise
+
+
+@app.route("/jobs/<int:job_id>", methods=['GET'])
+@auth.login_required
+@log_this
+def get_job(job_id):
+    try:
+        job = Job.get(id=job_id)
+    except Job.DoesNotExist:
+        return response_not_found(job_id)
+    # 'status' is a job field, so it can not go through response_ok
+    return make_response(jsonify(job.to_dict), 200)
 
 
 @app.route("/<string:provider_name>/<string:env>/ip/", methods=['POST'])
@@ -417,6 +501,26 @@ def get_hosts_names(provider_name, env, group_id):
     return response_ok(**{"names": host_names})
 
 
+@app.route(
+    "/<string:provider_name>/<string:env>/host-info/<group_id>/",
+    methods=['GET']
+)
+@auth.login_required
+@log_this
+def get_hosts_info(provider_name, env, group_id):
+    fields = request.args.get("fields", None)
+    fields = fields.split(",") if fields else None
+    try:
+        provider = build_provider(provider_name, env, None)
+        hosts = provider.get_hosts_info(group_id, fields)
+    except ValueError as e:
+        return response_invalid_request(str(e), status_code=400)
+    except Exception as e:
+        print_exc()
+        return response_invalid_request(str(e))
+    return response_ok(**{"hosts": hosts})
+
+
 @app.route(
     "/<string:provider_name>/<string:env>/host/configure/<string:host>",
     methods=['DELETE']
@@ -487,6 +591,39 @@ def status_host(provider_name, env, host_id):
         return response_not_found(host_id)
 
 
+@app.route(
+    "/<string:provider_name>/<string:env>/status", methods=['POST']
+)
+@auth.login_required
+@log_this
+def status_hosts(provider_name, env):
+    data = request.get_json()
+    try:
+        host_ids = [int(host_id) for host_id in data["host_ids"]]
+    except (KeyError, TypeError, ValueError):
+        return response_invalid_request("invalid data {}".format(data))
+    if not host_ids:
+        return response_invalid_request("invalid data {}".format(data))
+
+    hosts = list(Host.select().where(
+        (Host.id << host_ids) & (Host.environment == env)
+    ))
+    try:
+        provider = build_provider(provider_name, env, None)
+        statuses = provider.get_statuses(hosts)
+    except Exception as e:
+        print_exc()
+        return response_invalid_request(str(e))
+
+    not_found = {"error": "Could not found"}
+    return response_ok(**{
+        "hosts": {
+            str(host_id): statuses.get(host_id, not_found)
+            for host_id in host_ids
+        }
+    })
+
+
 @app.route(
     "/<string:provider_name>/<string:env>/credential/new", methods=['POST']
 )
@@ -504,6 +641,7 @@ def create_credential(provider_name, env):
             return response_created(
                 status_code=422, success=success, reason=str(resp)
             )
+        invalidate_credential(provider.get_provider(), env)
         return response_created(success=success, id=str(resp))
 
 
@@ -578,15 +716,12 @@ def update_credential(provider_name, uuid):
         credential = provider.build_credential().credential
 
         data.get('_id') and data.pop('_id')
+        data['version'] = new_version()
 
+        updated = credential.update({'_id': ObjectId(uuid)}, data)
+        invalidate_credential(provider.get_provider())
         return make_response(
-            json.dumps(
-                credential.update(
-                    {'_id': ObjectId(uuid)},
-                    data
-                ),
-                default=json_util.default
-            )
+            json.dumps(updated, default=json_util.default)
         )
     except Exception as e:
         return response_invalid_request(str(e))
@@ -599,6 +734,7 @@ def update_credential(provider_name, uuid):
 @auth.login_required
 @log_this
 def destroy_credential(provider_name, env):
+    provider_name = provider_name_of(provider_name)
     try:
         credential = CredentialAdd(provider_name, env, {})
         deleted = credential.delete()
@@ -608,6 +744,7 @@ def destroy_credential(provider_name, env):
     if deleted.deleted_count <= 0:
         return response_not_found("{}-{}".format(provider_name, env))
 
+    invalidate_credential(provider_name, env)
     return response_ok()
 
 
@@ -683,6 +820,30 @@ def sa_set_role(provider_name, env, sa):
         return response_ok()
     return response_empty_content()
 
+
+@app.route("/providers", methods=['GET'])
+@auth.login_required
+@log_this
+def list_providers():
+    return response_ok(**{
+        "providers": [
+            {"name": name, "aliases": aliases}
+            for name, aliases in sorted(registered_providers().items())
+        ]
+    })
+
+
+@app.route("/stats", methods=['GET'])
+@auth.login_required
+def cache_stats():
+    # Each worker has its own caches
+    return response_ok(**{
+        "pid": os.getpid(),
+        "credentials": credential_contents.stats,
+        "http_sessions": session_pool.stats,
+    })
+
+
 @app.route('/')
 def default_route():
     response = "host-provider, from dbaas/dbdev <br>"
@@ -1,11 +1,51 @@
-from copy import deepcopy
+import json
 from datetime import datetime
 from peewee import MySQLDatabase, Model, DateTimeField, CharField, \
-    PrimaryKeyField, IntegerField, ForeignKeyField, BooleanField
-from host_provider.settings import MYSQL_PARAMS
+    PrimaryKeyField, IntegerField, ForeignKeyField, BooleanField, TextField
+from playhouse.pool import PooledMySQLDatabase
+from host_provider.settings import MYSQL_PARAMS, MYSQL_DRIVER, \
+    MYSQL_MAX_CONNECTIONS, MYSQL_STALE_TIMEOUT, MYSQL_POOL_TIMEOUT
+from host_provider.credentials.base import zone_names
 
+try:
+    import pymysql
+except ImportError:
+    pymysql = None
 
-mysql_db = MySQLDatabase(**MYSQL_PARAMS)
+
+class PyMySQLDatabase(MySQLDatabase):
+    """
+        MySQL through PyMySQL, whatever driver peewee would pick.
+        Being pure python, its socket calls yield to other greenlets
+        when gevent patches the process.
+    """
+
+    def _connect(self, database, **kwargs):
+        conn_kwargs = {
+            'charset': 'utf8',
+            'use_unicode': True,
+        }
+        conn_kwargs.update(kwargs)
+        return pymysql.connect(db=database, **conn_kwargs)
+
+
+class PooledPyMySQLDatabase(PooledMySQLDatabase, PyMySQLDatabase):
+    pass
+
+
+def build_database(params=MYSQL_PARAMS, driver=MYSQL_DRIVER):
+    database_cls = PooledMySQLDatabase
+    if driver == 'pymysql' and pymysql is not None:
+        database_cls = PooledPyMySQLDatabase
+    return database_cls(
+        max_connections=MYSQL_MAX_CONNECTIONS,
+        stale_timeout=MYSQL_STALE_TIMEOUT,
+        timeout=MYSQL_POOL_TIMEOUT,
+        **params
+    )
+
+
+mysql_db = build_database()
 
 
 class BaseModel(Model):
@@ -24,24 +64,27 @@ class BaseModel(Model):
 class Host(BaseModel):
     id = PrimaryKeyField()
     name = CharField()
-    group = CharField()
+    group = CharField(index=True)
     engine = CharField()
     environment = CharField()
     cpu = IntegerField()
     memory = IntegerField()
     provider = CharField()
-    identifier = CharField()
+    identifier = CharField(index=True)
     address = CharField()
     zone = CharField(null=True)
     recreating = BooleanField(default=False)
 
     @property
     def to_dict(self):
-        my_data = deepcopy(self._data)
-        if 'password' in my_data:
-            my_data.pop('password')
+        my_data = {
+            field: value for field, value in self._data.items()
+            if field != 'password'
+        }
         my_data['zone_id'] = self.zone
-        my_data['zone'] = self.credential.zone_by_id(self.zone)
+        my_data['zone'] = zone_names.name_of(
+            self.provider, self.environment, self.zone
+        )
         return my_data
 
     @property
@@ -54,7 +97,7 @@ class Host(BaseModel):
 
 class IP(BaseModel):
     id = PrimaryKeyField()
-    name = CharField()
+    name = CharField(index=True)
     group = CharField()
     host = ForeignKeyField(Host, null=True, on_delete='SET NULL')
     address = CharField()
@@ -63,3 +106,50 @@ class IP(BaseModel):
     def to_dict(self):
         return self._data
 
+
+class Job(BaseModel):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    id = PrimaryKeyField()
+    action = CharField()
+    provider = CharField()
+    environment = CharField()
+    status = CharField(default=PENDING)
+    result = TextField(null=True)
+    error = TextField(null=True)
+    # "<hostname>:<pid>" of the worker that runs it
+    owner = CharField(null=True)
+
+    def _move(self, current, status, **fields):
+        """
+            Changes the status only from `current`, so a job failed
+            meanwhile by `JobPool.recover` stays failed.
+            Returns whether the job was changed.
+        """
+        fields.update(status=status, updated_at=datetime.now())
+        updated = Job.update(**fields).where(
+            (Job.id == self.id) & (Job.status == current)
+        ).execute()
+        if not updated:
+            return False
+        for name, value in fields.items():
+            setattr(self, name, value)
+        return True
+
+    def start(self):
+        return self._move(self.PENDING, self.RUNNING)
+
+    def finish(self, **result):
+        return self._move(self.RUNNING, self.DONE, result=json.dumps(result))
+
+    def fail(self, error):
+        return self._move(self.RUNNING, self.FAILED, error=error)
+
+    @property
+    def to_dict(self):
+        my_data = dict(self._data)
+        my_data['result'] = json.loads(self.result) if self.result else None
+        return my_data
@@ -1,14 +1,81 @@
+import sys
+from importlib import import_module
+from types import ModuleType
+
 from host_provider.providers.base import ProviderBase
-from host_provider.providers.cloudstack import CloudStackProvider
-from host_provider.providers.aws import AWSProvider
-from host_provider.providers.k8s import K8sProvider
-from host_provider.providers.gce import GceProvider
-from host_provider.providers.azure import AzureProvider
+from host_provider.settings import PRELOAD_PROVIDERS
+
+
+# Module of each provider (and alias) name, imported on first use
+PROVIDER_MODULES = {
+    'cloudstack': 'host_provider.providers.cloudstack',
+    'ec2': 'host_provider.providers.aws',
+    'aws': 'host_provider.providers.aws',
+    'k8s': 'host_provider.providers.k8s',
+    'gce': 'host_provider.providers.gce',
+    'azure_arm': 'host_provider.providers.azure',
+    'azure': 'host_provider.providers.azure',
+}
+PROVIDER_CLASSES = {
+    'CloudStackProvider': 'host_provider.providers.cloudstack',
+    'AWSProvider': 'host_provider.providers.aws',
+    'K8sProvider': 'host_provider.providers.k8s',
+    'GceProvider': 'host_provider.providers.gce',
+    'AzureProvider': 'host_provider.providers.azure',
+}
 
 
 def get_provider_to(provider_name):
-    for cls in ProviderBase.__subclasses__():
-        if cls.get_provider() == provider_name:
-            return cls
+    provider_cls = ProviderBase.registry.get(provider_name)
+    if provider_cls is None and provider_name in PROVIDER_MODULES:
+        import_module(PROVIDER_MODULES[provider_name])
+        provider_cls = ProviderBase.registry.get(provider_name)
+
+    if provider_cls is None:
+        raise NotImplementedError("No provider to '{}'".format(provider_name))
+    return provider_cls
+
+
+def provider_name_of(provider_name):
+    try:
+        return get_provider_to(provider_name).get_provider()
+    except NotImplementedError:
+        return provider_name
+
+
+def registered_providers():
+    for module_name in set(PROVIDER_MODULES.values()):
+        import_module(module_name)
+
+    providers = {}
+    for provider_cls in ProviderBase.registry.values():
+        providers[provider_cls.get_provider()] = sorted(provider_cls.aliases)
+    return providers
+
+
+class ProvidersModule(ModuleType):
+    """
+        Keeps `from host_provider.providers import GceProvider` working
+        while importing the provider module only at that moment (module
+        level __getattr__ needs python 3.7).
+    """
+
+    def __getattr__(self, name):
+        if name in PROVIDER_CLASSES:
+            return getattr(import_module(PROVIDER_CLASSES[name]), name)
+        raise AttributeError(
+            "module '{}' has no attribute '{}'".format(self.__name__, name)
+        )
+
+
+sys.modules[__name__].__class__ = ProvidersModule
+
+
+def preload_providers(provider_names=PRELOAD_PROVIDERS):
+    if 'all' in provider_names:
+        provider_names = PROVIDER_MODULES.keys()
+    for provider_name in provider_names:
+        get_provider_to(provider_name)
+
 
-    raise NotImplementedError("No provider to '{}'".format(provider_name))
+preload_providers()
@@ -28,6 +28,7 @@ class AWSProxyNotSet(Exception):
 
 class AWSProvider(ProviderBase):
     BasicInfo = namedtuple("EC2BasicInfo", "id")
+    aliases = ('aws',)
 
     def get_node(self, node_id):
         try:
@@ -126,6 +127,32 @@ class AWSProvider(ProviderBase):
         node = self.BasicInfo(identifier)
         return self.client.destroy_node(node)
 
+    def _is_ready(self, host):
+        node = self.get_node(host.identifier)
+        return node.state == 'running', node.id
+
+    def _are_ready(self, hosts):
+        client = self.client
+        try:
+            nodes = client.list_nodes(
+                ex_node_ids=[host.identifier for host in hosts]
+            )
+        except Exception:
+            # EC2 fails the whole call when one of the ids does not exist
+            return {host.id: self._is_ready_or_error(host) for host in hosts}
+        nodes = {node.id: node for node in nodes}
+
+        readiness = {}
+        for host in hosts:
+            node = nodes.get(host.identifier)
+            if node is None:
+                readiness[host.id] = NodeNotFounfError(
+                    "Node with id {} not found".format(host.identifier)
+                )
+            else:
+                readiness[host.id] = node.state == 'running', node.id
+        return readiness
+
     def _all_node_destroyed(self, group):
         self.credential.remove_last_used_for(group)
 
@@ -5,8 +5,11 @@ import json
 import re
 from collections import OrderedDict
 from contextlib import suppress
+from copy import deepcopy
+from threading import Lock
 from host_provider.credentials.azure import CredentialAddAzure, CredentialAzure
-from host_provider.common.azure import AzureConnection
+from host_provider.common.azure import AzureConnection, vm_size_catalog, \
+    vm_names
 from host_provider.models import Host
 from host_provider.providers import ProviderBase
 from libcloud.compute.types import Provider
@@ -33,9 +36,28 @@ class InvalidParameterError(Exception):
     pass
 
 
+class TemplateNotFoundError(Exception):
+    pass
+
+
+TEMPLATES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "templates", "azure", "version"
+)
+
+
 class JsonTemplates(object):
-    def __init__(self, path="host_provider/templates/azure/version/"):
+    """
+        Registry of the deploy templates, keyed by version and file name
+        (`<path>/<version>/**/<name>.json`). Every version is read and
+        checked once, `get` hands out a deep copy so callers can fill it in.
+    """
+
+    def __init__(self, path=TEMPLATES_PATH):
         self.path = path
+        self._templates = {}
+        self._loaded = False
+        self._lock = Lock()
 
     def list_files(self, version):
         files_version = os.path.join(self.path, f"{version}/")
@@ -54,9 +76,50 @@ class JsonTemplates(object):
             return json.dumps(obj)
         return None
 
+    def load_version(self, version):
+        templates = {}
+        for file in self.list_files(version):
+            template = self.load_json(file.as_posix())
+            if not isinstance(template.get("properties"), dict):
+                raise InvalidParameterError(
+                    "Template {} has no properties".format(file)
+                )
+            templates[file.name.split(".json")[0]] = template
+        return templates
+
+    def load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            templates = {}
+            for version in sorted(os.listdir(self.path)):
+                if os.path.isdir(os.path.join(self.path, version)):
+                    templates[version] = self.load_version(version)
+            self._templates = templates
+            self._loaded = True
+
+    @property
+    def versions(self):
+        self.load()
+        return sorted(self._templates)
+
+    def get(self, name, version):
+        self.load()
+        try:
+            template = self._templates[version][name]
+        except KeyError:
+            raise TemplateNotFoundError(
+                "Template {} version {} not found".format(name, version)
+            )
+        return deepcopy(template)
+
+
+json_templates = JsonTemplates()
+
 
 class AzureProvider(ProviderBase):
     BasicInfo = namedtuple("AzureBasicInfo", "id")
+    aliases = ('azure',)
     azClient = None
     connCls = AzureConnection
 
@@ -83,36 +146,78 @@ class AzureProvider(ProviderBase):
     def get_azure_connection(self):
         az = self.connCls()
         self.azClient = az
-        self.azClient._build_credentials()
-
-        return az.conn_cls(self.credential.access_id,
-                           self.credential.secret_key,
-                           tenant_id=self.credential.tenant_id,
-                           subscription_id=self.credential.subscription_id)
-
-    def get_node(self, node_id, api_version="2020-12-01"):
+        self.azClient._build_credentials(self.credential)
+        return az
 
+    def _get(self, action):
         self.get_azure_connection()
-        base_url = self.azClient.endpoint
-        action = (self.connCls.paths_connection_restapi.get("action_getnode").format(
-                    self.credential.subscription_id, api_version))
-
         header = {}
-        self.azClient.connect(base_url=base_url)
+        self.azClient.connect(base_url=self.azClient.endpoint)
         self.azClient.add_default_headers(header)
         self.azClient.connection.request("GET", action, headers=header)
-        resp = self.azClient.connection.getresponse()
+        return self.azClient.connection.getresponse()
+
+    def get_vm(self, name, api_version="2020-12-01"):
+        action = (self.connCls.paths_connection_restapi.get("action_deployvm").format(
+                    self.credential.subscription_id, self.credential.resource_group,
+                    name, api_version))
+        resp = self._get(action)
+        if resp.status_code == 404:
+            return None
+        if not resp.ok:
+            raise NodeFoundError(
+                "Could not get vm {}: {}".format(name, resp.status_code)
+            )
 
-        if resp.ok:
-            nodes = resp.json()["value"][0]
-            for key, value in nodes.items():
-                if key.startswith("properties") and node_id == value["vmId"]:
-                    return value
-            raise NodeFoundError("Node not found.")
+        vm = resp.json()
+        vm_id = vm.get("properties", {}).get("vmId")
+        if vm_id:
+            vm_names[vm_id] = vm["name"]
+        return vm
+
+    def iter_vms(self, api_version="2020-12-01"):
+        """
+            Virtual machines of the resource group, one page at a time,
+            following `nextLink` only while the caller keeps consuming.
+        """
+        action = (self.connCls.paths_connection_restapi.get("action_listgroupvm").format(
+                    self.credential.subscription_id, self.credential.resource_group,
+                    api_version))
+        while action:
+            resp = self._get(action)
+            if not resp.ok:
+                raise NodeFoundError(
+                    "Could not list vms: {}".format(resp.status_code)
+                )
+            page = resp.json()
+            for vm in page.get("value", []):
+                vm_id = vm.get("properties", {}).get("vmId")
+                if vm_id:
+                    vm_names[vm_id] = vm["name"]
+                yield vm
+            action = page.get("nextLink")
+
+    def _vm_name_from(self, node_id):
+        if node_id in vm_names:
+            return vm_names[node_id]
+        try:
+            return Host.get(identifier=node_id).name
+        except Host.DoesNotExist:
+            return None
+
+    def get_node(self, node_id, api_version="2020-12-01"):
+        name = self._vm_name_from(node_id)
+        if name:
+            vm = self.get_vm(name, api_version)
+            if vm and vm["properties"].get("vmId") == node_id:
+                return vm["properties"]
+
+        for vm in self.iter_vms(api_version):
+            if vm.get("properties", {}).get("vmId") == node_id:
+                return vm["properties"]
+        raise NodeFoundError("Node not found.")
 
     def _parse_image(self, name, size, gallery="myGallery", image="mssql_2019_0_0", version="1.0.0"):
-        sql_dict = OrderedDict()
-        templates = JsonTemplates()
         pw = self.credential.init_password
         region = self.credential.region
 
@@ -126,62 +231,58 @@ class AzureProvider(ProviderBase):
         os_profile = {"adminUsername": "dbaas", "computerName": name, "adminPassword": pw}
 
         try:
-            for file in templates.list_files(version):
-                file_name = file.name.split(".json")[0]
-                if file_name == "sql":
-                    sql_dict = templates.load_json(file.as_posix())
-                    sql_dict["properties"]["hardwareProfile"]["vmSize"] = size
-                    sql_dict["properties"]["storageProfile"]["imageReference"]["id"] = image_id
-                    sql_dict["properties"]["storageProfile"]["osDisk"]["name"] = name
-                    sql_dict["properties"]["osProfile"] = os_profile
-                    sql_dict["properties"]["networkProfile"]["networkInterfaces"][0]["id"] = network_id
-                    sql_dict["location"] = region
+            sql_dict = json_templates.get("sql", version)
+            sql_dict["properties"]["hardwareProfile"]["vmSize"] = size
+            sql_dict["properties"]["storageProfile"]["imageReference"]["id"] = image_id
+            sql_dict["properties"]["storageProfile"]["osDisk"]["name"] = name
+            sql_dict["properties"]["osProfile"] = os_profile
+            sql_dict["properties"]["networkProfile"]["networkInterfaces"][0]["id"] = network_id
+            sql_dict["location"] = region
             return sql_dict
         except Exception as error:
-            raise Exception("Template parse error: {}" % error)
+            raise Exception("Template parse error: {}".format(error))
 
-    def offering_to(self, cpu, memory, api_version="2020-12-01"):
-
-        self.get_azure_connection()
+    def list_vm_sizes(self, api_version="2020-12-01"):
+        az = self.connCls()
+        az._build_credentials(self.credential)
 
-        base_url = self.azClient.endpoint
         action = (self.connCls.paths_connection_restapi.get("action_offeringto").format(self.credential.subscription_id,
                                                                self.credential.region, api_version))
         header = {}
-        self.azClient.connect(base_url=base_url)
-        self.azClient.add_default_headers(header)
-        self.azClient.connection.request("GET", action, headers=header)
-        resp = self.azClient.connection.getresponse()
+        az.connect(base_url=az.endpoint)
+        az.add_default_headers(header)
+        az.connection.request("GET", action, headers=header)
+        resp = az.connection.getresponse()
 
         if resp.ok:
-            offerings = resp.json()["value"]
+            return resp.json()["value"]
+        return None
 
-            for offering in offerings:
-                if offering.get("memoryInMB") == memory and offering.get("numberOfCores") == cpu:
-                    return offering
+    def offering_to(self, cpu, memory, api_version="2020-12-01"):
+        offering = vm_size_catalog.find(
+            self.credential, cpu, memory,
+            lambda: self.list_vm_sizes(api_version)
+        )
+        if offering:
+            return offering
 
         raise OfferingNotFoundError(
             "Offering with {} cpu and {} of memory not found.".format(cpu, memory)
         )
 
     def _parse_nic(self, name, vnet, subnet, version="1.0.0"):
-        nic_dict = OrderedDict()
         id = (self.connCls.paths_connection_restapi.get("id_parsenic").format(self.credential.subscription_id,
                                                       self.credential.resource_group, vnet, subnet))
 
         region = self.credential.region
-        templates = JsonTemplates()
         try:
-            for file in templates.list_files(version):
-                file_name = file.name.split(".json")[0]
-                if file_name == "nic":
-                    nic_dict = templates.load_json(file.as_posix())
-                    config = nic_dict["properties"]["ipConfigurations"]
-                    for nic in config:
-                        nic["name"] = name
-                        nic["properties"]["subnet"]["id"] = id
-                    nic_dict["properties"]["ipConfigurations"] = config
-                    nic_dict["location"] = region
+            nic_dict = json_templates.get("nic", version)
+            config = nic_dict["properties"]["ipConfigurations"]
+            for nic in config:
+                nic["name"] = name
+                nic["properties"]["subnet"]["id"] = id
+            nic_dict["properties"]["ipConfigurations"] = config
+            nic_dict["location"] = region
             return nic_dict
         except Exception as error:
             raise Exception("Template not found error")
@@ -252,29 +353,10 @@ class AzureProvider(ProviderBase):
 
         return host
 
-    def _list_vm(self, name, only_status=True, api_version="2020-12-01"):
-        status_only = "false" if not only_status else "true"
-        self.get_azure_connection()
-        base_url = self.azClient.endpoint
-
-        action = (self.connCls.paths_connection_restapi.get("action_listvm").format(self.credential.subscription_id,
-                                                                         api_version, status_only))
-
-        header = {}
-        self.azClient.connect(base_url=base_url)
-        self.azClient.add_default_headers(header)
-        self.azClient.connection.request("GET", action, headers=header)
-        resp = self.azClient.connection.getresponse()
-
-        return resp.json()
-
     def deploy_vm(self, name, size, api_version="2020-12-01"):
         response_metadata = OrderedDict()
 
-        vms = self._list_vm(name).get("value", [])
-        has_name = lambda _vms, _name: [i for i in _vms if i.get("name", '') == _name]
-
-        if any(has_name(vms, name)):
+        if self.get_vm(name, api_version):
             raise DeployVmError("Already exists: %s" % name)
 
         size_name = size["name"]
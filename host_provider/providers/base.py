@@ -1,20 +1,35 @@
-import requests
 import datetime
-from requests.auth import HTTPBasicAuth
 
 from libcloud.compute.providers import get_driver
 from libcloud import security
 from host_provider.models import Host
 from dbaas_base_provider.baseProvider import BaseProvider
-from host_provider.settings import LIBCLOUD_CA_CERTS_PATH, TEAM_API_URL, DBAAS_TEAM_API_URL, USER_DBAAS_API, PASSWORD_DBAAS_API
+from host_provider.settings import LIBCLOUD_CA_CERTS_PATH, TEAM_API_URL
+from host_provider.common.team import CachedTeamClient, get_dbaas_team
 
 from dbaas_base_provider.log import log_this
-from dbaas_base_provider.team import TeamClient
+
+
+HOST_INFO_FIELDS = ('id', 'identifier', 'name', 'address', 'zone')
 
 
 class ProviderBase(BaseProvider):
 
     provider_type = "host_provider"
+    aliases = ()
+    # Idle clients are reused by other requests, see ProviderCache
+    pool_clients = True
+    # Provider name and aliases to class, filled as subclasses are defined
+    registry = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super(ProviderBase, cls).__init_subclass__(**kwargs)
+        try:
+            provider_name = cls.get_provider()
+        except NotImplementedError:
+            return
+        for name in (provider_name,) + tuple(cls.aliases):
+            ProviderBase.registry[name] = cls
 
     def __init__(self, environment, engine, auth_info=None):
         super(ProviderBase, self).__init__(
@@ -22,22 +37,69 @@ class ProviderBase(BaseProvider):
             engine=engine,
             auth_info=None
         )
+        self.cache_entry = None
+        # Credential version of the clients taken from `cache_entry`
+        self._client_version = None
 
         if LIBCLOUD_CA_CERTS_PATH is not None:
             security.CA_CERTS_PATH = LIBCLOUD_CA_CERTS_PATH
             if security.CA_CERTS_PATH == "":
                 security.CA_CERTS_PATH = None
 
+    @property
+    def client(self):
+        if not self._client:
+            if self.cache_entry is None:
+                self._client = self.build_client()
+            else:
+                self._client = self.acquire_client(self.build_client)
+        return self._client
+
+    @property
+    def credential(self):
+        if not self._credential:
+            self._credential = self.build_credential()
+        return self._credential
+
+    @property
+    def credential_version(self):
+        return self.credential.content.get('version')
+
+    def acquire_client(self, builder, key=None):
+        if self._client_version is None:
+            self._client_version = self.credential_version
+        return self.cache_entry.acquire_client(
+            builder, key, self._client_version
+        )
+
+    def release_client(self, client, key=None):
+        self.cache_entry.release_client(client, key, self._client_version)
+
+    def release(self):
+        if self.cache_entry is not None and self._client:
+            self.release_client(self._client)
+        self._client = None
+
     def get_driver(self):
         return get_driver(self.get_provider())
 
     def get_host_ids(self, group_id):
-        host_ids = Host.filter(group=group_id).select(Host.identifier)
-        return [x.identifier for x in host_ids]
+        host_ids = Host.select(Host.identifier).where(Host.group == group_id)
+        return [identifier for identifier, in host_ids.tuples()]
 
     def get_host_names(self, group_id):
-        host_names = Host.filter(group=group_id).select(Host.name)
-        return [x.name for x in host_names]
+        host_names = Host.select(Host.name).where(Host.group == group_id)
+        return [name for name, in host_names.tuples()]
+
+    def get_hosts_info(self, group_id, fields=None):
+        fields = fields or HOST_INFO_FIELDS
+        invalid = [field for field in fields if field not in Host._meta.fields]
+        if invalid:
+            raise ValueError("Invalid fields: {}".format(", ".join(invalid)))
+
+        columns = [getattr(Host, field) for field in fields]
+        hosts = Host.select(*columns).where(Host.group == group_id)
+        return list(hosts.dicts())
 
     @property
     def create_attempts(self):
@@ -75,10 +137,15 @@ class ProviderBase(BaseProvider):
 
     def create_host(self, cpu, memory, name, group, zone, *args, **kw):
         kw.update({'group': group})
-        self.credential.before_create_host(group)
         if zone:
             self.credential.zone = zone
-        result = self._create_host(cpu, memory, name, *args, **kw)
+        else:
+            self.credential.before_create_host(group)
+        try:
+            result = self._create_host(cpu, memory, name, *args, **kw)
+        except Exception:
+            self.credential.release_zone(group)
+            raise
         self.credential.after_create_host(group)
 
         return result
@@ -89,12 +156,42 @@ class ProviderBase(BaseProvider):
             return "READY", version_id
         return "NOT READY", None
 
+    def get_statuses(self, hosts):
+        statuses = {}
+        for host_id, ready in self._are_ready(hosts).items():
+            if isinstance(ready, Exception):
+                statuses[host_id] = {"error": str(ready)}
+                continue
+            is_ready, version_id = ready
+            statuses[host_id] = {
+                "host_status": "READY" if is_ready else "NOT READY",
+                "version_id": version_id if is_ready else None
+            }
+        return statuses
+
+    def _are_ready(self, hosts):
+        """
+            Readiness of each host by id, or the exception raised when
+            checking it. The default checks the hosts one at a time with
+            `_is_ready`, as they all share this provider and its client;
+            providers that can list many hosts in one call override it.
+        """
+        return {host.id: self._is_ready_or_error(host) for host in hosts}
+
+    def _is_ready_or_error(self, host):
+        try:
+            ready = self._is_ready(host)
+        except Exception as e:
+            return e
+        if not isinstance(ready, tuple) or len(ready) != 2:
+            return ValueError("Status not available for {} hosts".format(
+                self.get_provider()
+            ))
+        return ready
+
     def get_team_labels_formatted(self, team_name, infra_name='', database_name=''):
-        team_labels = {}
-        url = DBAAS_TEAM_API_URL + team_name
-        response = requests.get(url, verify=False, auth=HTTPBasicAuth(USER_DBAAS_API, PASSWORD_DBAAS_API))
-        if response.status_code == 200:
-            team = response.json()
+        team = get_dbaas_team(team_name)
+        if team is not None:
             team_labels = {
                 "servico_de_negocio": team["business_service"],
                 "cliente": team["client"],
@@ -106,7 +203,7 @@ class ProviderBase(BaseProvider):
                 "database_name": database_name
             }
         else:
-            team = TeamClient(api_url=TEAM_API_URL, team_name=team_name)
+            team = CachedTeamClient(api_url=TEAM_API_URL, team_name=team_name)
             team_labels = team.make_labels(
                 engine_name=self.engine_name,
                 infra_name=infra_name,
@@ -0,0 +1,87 @@
+from collections import deque
+from threading import Lock
+
+from cachetools import TTLCache
+
+from host_provider.settings import PROVIDER_CACHE_TTL, \
+    PROVIDER_CACHE_MAXSIZE, PROVIDER_CACHE_IDLE_CLIENTS
+
+
+class ProviderCacheEntry(object):
+    """
+        Setup work shared by every provider built for the same
+        (provider, environment, engine): small stacks of idle cloud
+        clients, one for the main client and one for each extra service
+        (by `key`). Credential documents are shared by
+        `credential_contents`.
+        Clients are handed to one provider at a time, because the
+        underlying http objects are not safe to share between greenlets.
+        Clients are kept for the credential `version` they were built
+        from: a new version, seen by any worker once `credential_contents`
+        reloads the document, drops the idle clients of the old one.
+    """
+
+    def __init__(self, max_idle_clients):
+        self.max_idle_clients = max_idle_clients
+        self.version = None
+        self._idle_clients = {}
+
+    def _idle(self, key):
+        return self._idle_clients.setdefault(
+            key, deque(maxlen=self.max_idle_clients)
+        )
+
+    def acquire_client(self, builder, key=None, version=None):
+        if version != self.version:
+            self._idle_clients = {}
+            self.version = version
+        try:
+            return self._idle(key).pop()
+        except IndexError:
+            return builder()
+
+    def release_client(self, client, key=None, version=None):
+        if version == self.version:
+            self._idle(key).append(client)
+
+
+class ProviderCache(object):
+
+    def __init__(self, maxsize=PROVIDER_CACHE_MAXSIZE, ttl=PROVIDER_CACHE_TTL,
+                 max_idle_clients=PROVIDER_CACHE_IDLE_CLIENTS):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = Lock()
+        self.max_idle_clients = max_idle_clients
+
+    def entry_for(self, provider, environment, engine):
+        key = (provider, environment, engine)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = ProviderCacheEntry(self.max_idle_clients)
+                self._entries[key] = entry
+        return entry
+
+    def build(self, provider_cls, environment, engine, auth_info=None):
+        provider = provider_cls(environment, engine, auth_info)
+        if not provider_cls.pool_clients:
+            return provider
+        provider.cache_entry = self.entry_for(
+            provider_cls.get_provider(), environment, engine
+        )
+        return provider
+
+    def invalidate(self, provider, environment=None):
+        with self._lock:
+            for key in list(self._entries.keys()):
+                if key[0] != provider:
+                    continue
+                if environment is None or key[1] == environment:
+                    self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -4,11 +4,11 @@ import httplib2
 import socket
 import google_auth_httplib2
 
-from time import sleep
-import googleapiclient.discovery
 from google.oauth2 import service_account
 from googleapiclient.errors import HttpError
 from host_provider.settings import HTTP_PROXY
+from host_provider.common.gce import discovery_documents, \
+    operation_waiter, poll, image_links, ResourceMemo
 from host_provider.credentials.gce import CredentialGce, CredentialAddGce
 from host_provider.providers.base import ProviderBase
 from host_provider.models import Host, IP
@@ -36,10 +36,20 @@ class NotDefinedError(Exception):
 
 
 class GceProvider(ProviderBase):
-    WAIT_ATTEMPTS = 100
-    WAIT_TIME = 3
+    DESTROY_WAIT_TIMEOUT = 300
+    ROLE_WAIT_TIMEOUT = 100
+
+    def __init__(self, *args, **kwargs):
+        super(GceProvider, self).__init__(*args, **kwargs)
+        self._services = {}
+        self._service_account_credentials = None
+        # Instances and addresses read while serving this request
+        self.resources = ResourceMemo()
 
     def get_service_account_credentials(self):
+        if self._service_account_credentials:
+            return self._service_account_credentials
+
         service_account_data = self.credential.content['service_account']
         service_account_data['private_key'] = service_account_data[
             'private_key'
@@ -49,6 +59,7 @@ class GceProvider(ProviderBase):
             service_account_data,
             scopes=self.credential.scopes
         )
+        self._service_account_credentials = credentials
         return credentials
 
     def get_authorized_http(self, credentials):
@@ -70,105 +81,54 @@ class GceProvider(ProviderBase):
 
         return authorized_http
 
-    def get_cloudidentity_service_client(self):
+    def build_service(self, name, version):
         credentials = self.get_service_account_credentials()
 
         if HTTP_PROXY:
             authorized_http = self.get_authorized_http(credentials)
-
-            service = googleapiclient.discovery.build(
-                'cloudidentity',
-                'v1',
-                http=authorized_http)
-        else:
-            service = googleapiclient.discovery.build(
-                'cloudidentity',
-                'v1',
-                credentials=credentials,
+            return discovery_documents.build(
+                name, version, http=authorized_http
             )
 
-        return service
-
-    def get_pubsub_service_client(self):
-        credentials = self.get_service_account_credentials()
+        return discovery_documents.build(
+            name, version, credentials=credentials
+        )
 
-        if HTTP_PROXY:
-            authorized_http = self.get_authorized_http(credentials)
+    def get_service(self, name, version):
+        key = (name, version)
+        if key not in self._services:
+            if self.cache_entry is None:
+                service = self.build_service(name, version)
+            else:
+                service = self.acquire_client(
+                    lambda: self.build_service(name, version), key
+                )
+            self._services[key] = service
+        return self._services[key]
+
+    def release(self):
+        if self.cache_entry is not None:
+            for key, service in self._services.items():
+                self.release_client(service, key)
+        self._services = {}
+        super(GceProvider, self).release()
 
-            service = googleapiclient.discovery.build(
-                'pubsub',
-                'v1',
-                http=authorized_http)
-        else:
-            service = googleapiclient.discovery.build(
-                'pubsub',
-                'v1',
-                credentials=credentials,
-            )
+    def get_cloudidentity_service_client(self):
+        return self.get_service('cloudidentity', 'v1')
 
-        return service
+    def get_pubsub_service_client(self):
+        return self.get_service('pubsub', 'v1')
 
     def get_resource_manager_service_client(self):
-        credentials = self.get_service_account_credentials()
-
-        if HTTP_PROXY:
-            authorized_http = self.get_authorized_http(credentials)
-
-            service = googleapiclient.discovery.build(
-                'cloudresourcemanager',
-                'v1',
-                http=authorized_http)
-        else:
-            service = googleapiclient.discovery.build(
-                'cloudresourcemanager',
-                'v1',
-                credentials=credentials,
-            )
-
-        return service
+        return self.get_service('cloudresourcemanager', 'v1')
 
     def build_client(self):
-        credentials = self.get_service_account_credentials()
-
-        cont = 0
-        while cont <= 1:
-            cont += 1
-            try:
-                if HTTP_PROXY:
-                    socket.setdefaulttimeout(15)
-                    authorized_http = self.get_authorized_http(credentials)
-                    service = googleapiclient.discovery.build('compute', 'v1', http=authorized_http)
-                else:
-                    service = googleapiclient.discovery.build('compute', 'v1', credentials=credentials)
-
-                return service
-
-            except:
-                raise
-
-        return False
-
-    def get_iam_service_client(self):
-        credentials = self.get_service_account_credentials()
-        print("creating iam service gcp")
         if HTTP_PROXY:
-            print("-- using proxy")
-            print(HTTP_PROXY)
-            authorized_http = self.get_authorized_http(credentials)
-
-            service = googleapiclient.discovery.build(
-                        'iam',
-                        'v1',
-                        http=authorized_http)
-        else:
-            print("-- not using proxy")
-            service = googleapiclient.discovery.build(
-                'iam',
-                'v1',
-                credentials=credentials,
-            )
+            socket.setdefaulttimeout(15)
+        return self.build_service('compute', 'v1')
 
-        return service
+    def get_iam_service_client(self):
+        return self.get_service('iam', 'v1')
 
     @classmethod
     def get_provider(cls):
@@ -188,6 +148,16 @@ class GceProvider(ProviderBase):
     def get_credential_add(self):
         return CredentialAddGce
 
+    def _wait(self, operation, region=None, zone=None):
+        try:
+            return operation_waiter.wait(
+                self.client, self.credential.project, operation,
+                region=region, zone=zone
+            )
+        finally:
+            # The operation changed resources that may have been read
+            self.resources.clear()
+
     def start(self, host):
         project = self.credential.project
         zone = host.zone
@@ -224,12 +194,15 @@ class GceProvider(ProviderBase):
 
     @property
     def disk_image_link(self):
-        image_response = self.client.images().get(
-            project=self.credential.template_project,
-            image=self.credential.template_to(self.engine),
-        ).execute()
+        project = self.credential.template_project
+        image = self.credential.template_to(self.engine)
 
-        return image_response['selfLink']
+        def fetch():
+            return self.client.images().get(
+                project=project, image=image
+            ).execute()['selfLink']
+
+        return image_links.get(project, image, fetch)
 
     def get_machine_type(self, offering, zone):
         return "zones/{}/machineTypes/{}".format(
@@ -256,12 +229,7 @@ class GceProvider(ProviderBase):
             )
         static_ip = self.get_static_ip_by_name(static_ip_id)
 
-        static_ip_detail = self.get_or_none_resource(
-            self.client.addresses,
-            project=self.credential.project,
-            region=self.credential.region,
-            address=static_ip.name
-        )
+        static_ip_detail = self.get_static_ip_detail(static_ip.name)
         if static_ip_detail:
             subnetwork = static_ip_detail['subnetwork'].replace('https://www.googleapis.com/compute/v1/', '')
         else:
@@ -321,21 +289,12 @@ class GceProvider(ProviderBase):
 
         }
 
-        # Search for the instance on all available zones
-        for available_zone in self.credential.availability_zones:
-            instance = self.get_or_none_resource(
-                self.client.instances,
-                project=self.credential.project,
-                instance=name,
-                zone=available_zone
-            )
-
-            if instance is not None:
-                # Set zone to instance location
-                self.credential.zone = available_zone
-                break
-
-        if instance is None:
+        # Search for the instance on all available zones at once
+        instance_zone, instance = self.find_instance(name)
+        if instance is not None:
+            # Set zone to instance location
+            self.credential.zone = instance_zone
+        else:
             operation = self.client.instances().insert(
                 project=self.credential.project,
                 zone=zone,
@@ -352,7 +311,6 @@ class GceProvider(ProviderBase):
         return instance
 
     def _destroy(self, identifier):
-        attempt = 0
         host = Host.get(identifier=identifier)
 
         get_inst = self.get_instance(
@@ -361,20 +319,17 @@ class GceProvider(ProviderBase):
             execute_request=False
         )
 
-        while attempt < self.WAIT_ATTEMPTS:
+        def instance_settled():
             try:
                 inst = get_inst.execute()
             except Exception as ex:
                 if ex.resp.status == 404:
-                    return True
+                    return 'DELETED'
                 raise ex
-            else:
-                if (inst.get('status') in ['STOPPING']):
-                    sleep(self.WAIT_TIME)
-                else:
-                    attempt = self.WAIT_ATTEMPTS
+            return inst.get('status') != 'STOPPING'
 
-            attempt += 1
+        if poll(instance_settled, self.DESTROY_WAIT_TIMEOUT) == 'DELETED':
+            return True
 
         destroy = self.client.instances().delete(
             project=self.credential.project,
@@ -388,14 +343,7 @@ class GceProvider(ProviderBase):
         )
 
     def create_static_ip(self, group, ip_name):
-        self.credential.before_create_host(group)
-
-        address = self.get_or_none_resource(
-            self.client.addresses,
-            project=self.credential.project,
-            region=self.credential.region,
-            address=ip_name
-        )
+        address = self.get_static_ip_detail(ip_name)
 
         if address is None:
             address = self.client.addresses().insert(
@@ -493,25 +441,62 @@ class GceProvider(ProviderBase):
         host.save()
         return host
 
-    def get_instance(self, instance_name, zone, execute_request=True):
-        request = self.client.instances().get(
+    def find_instance(self, instance_name):
+        response = self.client.instances().aggregatedList(
             project=self.credential.project,
-            zone=zone,
-            instance=instance_name
-        )
+            filter='name = "{}"'.format(instance_name)
+        ).execute()
+
+        for scope, scoped_list in response.get('items', {}).items():
+            zone = scope.replace('zones/', '')
+            if zone not in self.credential.availability_zones:
+                continue
+            for instance in scoped_list.get('instances', []):
+                if instance.get('name') == instance_name:
+                    self.resources.set(
+                        ('instance', zone, instance_name), instance
+                    )
+                    return zone, instance
+        return None, None
+
+    def get_instance(self, instance_name, zone, execute_request=True):
+        def request():
+            return self.client.instances().get(
+                project=self.credential.project,
+                zone=zone,
+                instance=instance_name
+            )
         if execute_request:
-            return request.execute()
-        return request
+            return self.resources.get(
+                ('instance', zone, instance_name),
+                lambda: request().execute()
+            )
+        return request()
 
     def get_internal_static_ip(self, ip_name, execute_request=True):
-        request = self.client.addresses().get(
-            project=self.credential.project,
-            region=self.credential.region,
-            address=ip_name
-        )
+        def request():
+            return self.client.addresses().get(
+                project=self.credential.project,
+                region=self.credential.region,
+                address=ip_name
+            )
         if execute_request:
-            return request.execute()
-        return request
+            return self.resources.get(
+                ('address', self.credential.region, ip_name),
+                lambda: request().execute()
+            )
+        return request()
+
+    def get_static_ip_detail(self, ip_name):
+        return self.resources.get(
+            ('address', self.credential.region, ip_name),
+            lambda: self.get_or_none_resource(
+                self.client.addresses,
+                project=self.credential.project,
+                region=self.credential.region,
+                address=ip_name
+            )
+        )
 
     def _restore(self, host, engine, *args, **kw):
 
@@ -599,14 +584,11 @@ class GceProvider(ProviderBase):
         except Exception as ex:
             raise ex
 
-        wait_try = 0
-
-        # decrease attempts
-        while (self.WAIT_ATTEMPTS / 3) > wait_try:
-            if self.check_sa_in_roles(sa, self.credential.roles):
-                return True
-            sleep(self.WAIT_TIME)
-            wait_try += 1
+        if poll(
+            lambda: self.check_sa_in_roles(sa, self.credential.roles),
+            self.ROLE_WAIT_TIMEOUT
+        ):
+            return True
 
         raise ServiceAccountRoleCheckError("Role not applied")
 
@@ -1,33 +1,58 @@
-from jinja2 import Environment, PackageLoader
-from yaml import safe_load
+from jinja2 import Environment, FileSystemBytecodeCache, PackageLoader
+from yaml import load
 import logging
 from kubernetes.client import Configuration, ApiClient, AppsV1Api, CoreV1Api
 from kubernetes.client.rest import ApiException
 from host_provider.models import Host
+from host_provider.common.k8s import pod_informers
 from host_provider.credentials.k8s import CredentialK8s, CredentialAddK8s
 from host_provider.providers.base import ProviderBase
+from host_provider.settings import K8S_TEMPLATES_BYTECODE_CACHE, \
+    K8S_POD_INFORMER
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
 
 LOG = logging.getLogger(__name__)
 
 
+def build_template_environment(bytecode_cache_dir=None):
+    bytecode_cache = None
+    if bytecode_cache_dir:
+        bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+    return Environment(
+        loader=PackageLoader('host_provider', 'templates/k8s/yamls/'),
+        bytecode_cache=bytecode_cache,
+        auto_reload=False
+    )
+
+
+# Templates are compiled on their first render and kept for the process
+template_environment = build_template_environment(
+    K8S_TEMPLATES_BYTECODE_CACHE
+)
+
+
 class K8sClient(AppsV1Api, CoreV1Api):
     pass
 
 
 class K8sProvider(ProviderBase):
 
+    # Clients carry the caller's token and endpoint (auth_info)
+    pool_clients = False
+
     @staticmethod
     def render_to_string(path, template_context):
-        env = Environment(
-            loader=PackageLoader('host_provider', 'templates/k8s/yamls/')
-        )
-        template = env.get_template(path)
+        template = template_environment.get_template(path)
         return template.render(**template_context)
 
     def yaml_file(self, path, context):
         yaml_file = self.render_to_string(path, context)
-        return safe_load(yaml_file)
+        return load(yaml_file, Loader=SafeLoader)
 
     def build_client(self):
         configuration = Configuration()
@@ -58,8 +83,28 @@ class K8sProvider(ProviderBase):
     def get_credential_add(self):
         return CredentialAddK8s
 
+    @property
+    def pod_informer(self):
+        if not K8S_POD_INFORMER:
+            return None
+        return pod_informers.get(
+            self.auth_info['K8S-Endpoint'], self.namespace,
+            self.auth_info['K8S-Token'], self.build_client
+        )
+
+    def _cached_pod(self, name):
+        informer = self.pod_informer
+        if informer is None:
+            return None
+        return informer.get(name)
+
     def _pod_metadata(self, host):
-        return self.client.read_namespaced_pod_status(host.name, self.namespace)
+        pod_data = self._cached_pod(host.name)
+        if pod_data is None:
+            pod_data = self.client.read_namespaced_pod_status(
+                host.name, self.namespace
+            )
+        return pod_data
 
     def start(self, host):
         pass
@@ -220,7 +265,9 @@ class K8sProvider(ProviderBase):
         return stateful
 
     def _is_ready(self, host):
-        pod_data = self._pod_metadata(host)
+        return self._pod_is_ready(self._pod_metadata(host))
+
+    def _pod_is_ready(self, pod_data):
         if not pod_data.status.conditions:
             return False, None
         for status_data in pod_data.status.conditions:
@@ -229,6 +276,36 @@ class K8sProvider(ProviderBase):
                     return True, pod_data.metadata.uid
         return False, None
 
+    def _are_ready(self, hosts):
+        pods = {}
+        for host in hosts:
+            pod_data = self._cached_pod(host.name)
+            if pod_data is not None:
+                pods[host.name] = pod_data
+
+        missing = [host for host in hosts if host.name not in pods]
+        if missing:
+            groups = sorted(set(host.group for host in missing))
+            listed = self.client.list_namespaced_pod(
+                self.namespace,
+                label_selector="name in ({})".format(",".join(groups))
+            )
+            for pod_data in listed.items:
+                pods.setdefault(pod_data.metadata.name, pod_data)
+
+        readiness = {}
+        for host in hosts:
+            pod_data = pods.get(host.name)
+            if pod_data is None:
+                readiness[host.id] = False, None
+            else:
+                readiness[host.id] = self._pod_is_ready(pod_data)
+        return readiness
+
     def _refresh_metadata(self, host):
-        pod_metadata = self.client.read_namespaced_pod(host.name, self.namespace)
+        pod_metadata = self._cached_pod(host.name)
+        if pod_metadata is None:
+            pod_metadata = self.client.read_namespaced_pod(
+                host.name, self.namespace
+            )
         host.address = pod_metadata.status.pod_ip
@@ -1,4 +1,4 @@
-from os import getenv
+from os import getenv, path
 import re
 import json
 import logging
@@ -12,6 +12,13 @@ MONGODB_DB = getenv("MONGODB_DB", "host_provider")
 MONGODB_USER = getenv("MONGODB_USER", None)
 MONGODB_PWD = getenv("MONGODB_PWD", None)
 MONGO_ENDPOINT = getenv("DBAAS_MONGODB_ENDPOINT", None)
+MONGODB_MAX_POOL_SIZE = int(getenv("MONGODB_MAX_POOL_SIZE", 50))
+MONGODB_MAX_IDLE_TIME_MS = int(getenv("MONGODB_MAX_IDLE_TIME_MS", 300000))
+CREDENTIAL_CHECK_INTERVAL = int(getenv("CREDENTIAL_CHECK_INTERVAL", 30))
+CREDENTIAL_CHANGE_STREAM = bool(int(getenv("CREDENTIAL_CHANGE_STREAM", "0")))
+CREDENTIAL_WATCH_RETRY_INTERVAL = int(
+    getenv("CREDENTIAL_WATCH_RETRY_INTERVAL", 300)
+)
 
 
 MYSQL_HOST = getenv("MYSQL_HOST", "127.0.0.1")
@@ -35,6 +42,12 @@ if MYSQL_USER:
     MYSQL_PARAMS["user"] = MYSQL_USER
     MYSQL_PARAMS["password"] = MYSQL_PWD
 
+# "pymysql" (pure python, cooperative with gevent) or "mysqlclient"
+MYSQL_DRIVER = getenv("MYSQL_DRIVER", "pymysql")
+MYSQL_MAX_CONNECTIONS = int(getenv("MYSQL_MAX_CONNECTIONS", 20))
+MYSQL_STALE_TIMEOUT = int(getenv("MYSQL_STALE_TIMEOUT", 300))
+MYSQL_POOL_TIMEOUT = int(getenv("MYSQL_POOL_TIMEOUT", 10))
+
 APP_USERNAME = getenv("APP_USERNAME", None)
 APP_PASSWORD = getenv("APP_PASSWORD", None)
 HTTP_PROXY = getenv("DBAAS_HTTP_PROXY", None)
@@ -44,6 +57,52 @@ TEAM_API_URL = getenv("TEAM_API_URL", None)
 DBAAS_TEAM_API_URL = getenv("DBAAS_TEAM_API_URL", None)
 USER_DBAAS_API = getenv("USER_DBAAS_API", "user")
 PASSWORD_DBAAS_API = getenv("PASSWORD_DBAAS_API", "password")
+TEAM_API_TIMEOUT = float(getenv("TEAM_API_TIMEOUT", 5))
+TEAM_CACHE_TTL = int(getenv("TEAM_CACHE_TTL", 300))
+TEAM_CACHE_MAX_STALE = int(getenv("TEAM_CACHE_MAX_STALE", 3600))
 
 LOGGING_LEVEL = int(getenv('LOGGING_LEVEL', logging.INFO))
 SENTRY_DSN = getenv("SENTRY_DSN", None)
+
+# Provider modules are imported on first use, unless listed here
+# (comma separated provider names, or "all")
+PRELOAD_PROVIDERS = [
+    name.strip() for name in getenv("PRELOAD_PROVIDERS", "").split(",")
+    if name.strip()
+]
+
+PROVIDER_CACHE_TTL = int(getenv("PROVIDER_CACHE_TTL", 300))
+PROVIDER_CACHE_MAXSIZE = int(getenv("PROVIDER_CACHE_MAXSIZE", 64))
+PROVIDER_CACHE_IDLE_CLIENTS = int(getenv("PROVIDER_CACHE_IDLE_CLIENTS", 4))
+ZONE_NAMES_TTL = int(getenv("ZONE_NAMES_TTL", 300))
+
+JOB_WORKERS = int(getenv("JOB_WORKERS", 4))
+JOB_TIMEOUT = int(getenv("JOB_TIMEOUT", 3600))
+
+GCE_DISCOVERY_PATH = getenv(
+    "GCE_DISCOVERY_PATH",
+    path.join(path.dirname(__file__), "templates", "gce", "discovery")
+)
+GCE_OPERATION_TIMEOUT = int(getenv("GCE_OPERATION_TIMEOUT", 900))
+GCE_BACKOFF_INITIAL = float(getenv("GCE_BACKOFF_INITIAL", 1))
+GCE_BACKOFF_MAX = float(getenv("GCE_BACKOFF_MAX", 30))
+GCE_IMAGE_LINK_TTL = int(getenv("GCE_IMAGE_LINK_TTL", 600))
+
+# Directory to keep compiled K8s templates across worker restarts
+K8S_TEMPLATES_BYTECODE_CACHE = getenv("K8S_TEMPLATES_BYTECODE_CACHE", None)
+# Answer pod reads from a per namespace list/watch cache
+K8S_POD_INFORMER = bool(int(getenv("K8S_POD_INFORMER", "0")))
+K8S_INFORMER_RESYNC = int(getenv("K8S_INFORMER_RESYNC", 300))
+K8S_INFORMER_MAX_PODS = int(getenv("K8S_INFORMER_MAX_PODS", 5000))
+K8S_INFORMER_RETRY_INTERVAL = int(getenv("K8S_INFORMER_RETRY_INTERVAL", 30))
+K8S_INFORMER_MAX = int(getenv("K8S_INFORMER_MAX", 16))
+
+AZURE_TOKEN_REFRESH_MARGIN = int(getenv("AZURE_TOKEN_REFRESH_MARGIN", 300))
+
+HTTP_POOL_CONNECTIONS = int(getenv("HTTP_POOL_CONNECTIONS", 10))
+HTTP_POOL_MAXSIZE = int(getenv("HTTP_POOL_MAXSIZE", 10))
+HTTP_POOL_MAX_KEEP_ALIVE = int(getenv("HTTP_POOL_MAX_KEEP_ALIVE", 300))
+HTTP_MAX_RETRIES = int(getenv("HTTP_MAX_RETRIES", 3))
+
+AZURE_VM_SIZES_TTL = int(getenv("AZURE_VM_SIZES_TTL", 3600))
+AZURE_VM_SIZES_PERSIST = bool(int(getenv("AZURE_VM_SIZES_PERSIST", "0")))
@@ -0,0 +1,99 @@
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from host_provider.common.azure import AzureConnection, AzureToken, \
+    TokenCache
+
+
+KEY = ("fake_tenant", "fake_client", "fake_scope")
+
+
+class SyncThread(object):
+
+    def __init__(self, target, args):
+        self.target = target
+        self.args = args
+        self.daemon = False
+
+    def start(self):
+        self.target(*self.args)
+
+
+def token_expiring_in(seconds, access_token="fake_token"):
+    return AzureToken(access_token, time.time() + seconds)
+
+
+@patch('host_provider.common.azure.Thread', new=SyncThread)
+class TokenCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.cache = TokenCache(refresh_margin=300)
+
+    def test_reuse_valid_token(self):
+        fetch = MagicMock(return_value=token_expiring_in(3600))
+        first = self.cache.get(KEY, fetch)
+        second = self.cache.get(KEY, fetch)
+
+        self.assertIs(first, second)
+        fetch.assert_called_once_with()
+
+    def test_fetch_expired_token(self):
+        fetch = MagicMock(side_effect=[
+            token_expiring_in(10, "old"), token_expiring_in(3600, "new")
+        ])
+        self.cache.get(KEY, fetch)
+
+        self.assertEqual(self.cache.get(KEY, fetch).access_token, "new")
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_refresh_before_expiry(self):
+        fetch = MagicMock(side_effect=[
+            token_expiring_in(200, "old"), token_expiring_in(3600, "new")
+        ])
+        self.cache.get(KEY, fetch)
+
+        self.assertEqual(self.cache.get(KEY, fetch).access_token, "old")
+        self.assertEqual(self.cache.get(KEY, fetch).access_token, "new")
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_refresh_error_keeps_token(self):
+        fetch = MagicMock(side_effect=[
+            token_expiring_in(200, "old"), Exception("login down")
+        ])
+        self.cache.get(KEY, fetch)
+
+        self.assertEqual(self.cache.get(KEY, fetch).access_token, "old")
+        self.assertEqual(self.cache._refreshing, set())
+
+    def test_tokens_per_key(self):
+        fetch = MagicMock(return_value=token_expiring_in(3600))
+        self.cache.get(KEY, fetch)
+        self.cache.get(("other_tenant",) + KEY[1:], fetch)
+        self.assertEqual(fetch.call_count, 2)
+
+
+class AzureConnectionTokenTestCase(TestCase):
+
+    def setUp(self):
+        self.connection = AzureConnection()
+        self.connection.key = "fake_client"
+        self.connection.tenant_id = "fake_tenant"
+        self.connection.login_resource = "fake_scope"
+
+    @patch('host_provider.common.azure.token_cache', new_callable=TokenCache)
+    def test_connections_share_token(self, token_cache):
+        token = token_expiring_in(3600)
+        other = AzureConnection()
+        other.key = "fake_client"
+        other.tenant_id = "fake_tenant"
+        other.login_resource = "fake_scope"
+
+        with patch.object(AzureConnection, '_request_token',
+                          return_value=token) as request_token:
+            self.connection.get_token_from_credentials()
+            other.get_token_from_credentials()
+
+        request_token.assert_called_once_with()
+        self.assertEqual(other.access_token, "fake_token")
+        self.assertEqual(other.expires_at, token.expires_at)
@@ -0,0 +1,86 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from host_provider.common.azure import VmSizeCatalog
+from .test_azure_token import SyncThread
+
+
+FAKE_SIZES = [
+    {"name": "Standard_B1s", "numberOfCores": 1, "memoryInMB": 1024},
+    {"name": "Standard_B2s", "numberOfCores": 2, "memoryInMB": 4096},
+    {"name": "Standard_D2s", "numberOfCores": 2, "memoryInMB": 4096},
+]
+
+
+class FakeCredential(object):
+    subscription_id = "fake_subscription"
+    region = "eastus"
+
+    def __init__(self):
+        self.collection_vm_sizes = MagicMock()
+        self.collection_vm_sizes.find_one.return_value = None
+
+
+@patch('host_provider.common.azure.Thread', new=SyncThread)
+class VmSizeCatalogTestCase(TestCase):
+
+    def setUp(self):
+        self.catalog = VmSizeCatalog(ttl=60, persist=False)
+        self.credential = FakeCredential()
+        self.fetch = MagicMock(return_value=FAKE_SIZES)
+
+    def find(self, cpu, memory):
+        return self.catalog.find(self.credential, cpu, memory, self.fetch)
+
+    def test_fetch_once(self):
+        self.assertEqual(self.find(1, 1024)["name"], "Standard_B1s")
+        self.assertEqual(self.find(2, 4096)["name"], "Standard_B2s")
+        self.fetch.assert_called_once_with()
+
+    def test_first_size_wins(self):
+        self.assertEqual(self.find(2, 4096)["name"], "Standard_B2s")
+
+    def test_not_found_reloads_once(self):
+        self.find(1, 1024)
+        self.assertIsNone(self.find(8, 1024))
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_fetch_error(self):
+        self.fetch.return_value = None
+        self.assertIsNone(self.find(1, 1024))
+        self.assertEqual(self.catalog._indexes, {})
+
+    @patch('host_provider.common.azure.time.time')
+    def test_stale_index_refreshed(self, fake_time):
+        fake_time.return_value = 1000
+        self.find(1, 1024)
+
+        fake_time.return_value = 1061
+        self.fetch.return_value = FAKE_SIZES[:1]
+        self.assertEqual(self.find(2, 4096)["name"], "Standard_B2s")
+        self.assertIsNone(self.find(2, 4096))
+        self.assertEqual(self.fetch.call_count, 3)
+
+    def test_persisted(self):
+        self.catalog.persist = True
+        self.find(1, 1024)
+        stored_key = {
+            "subscription_id": "fake_subscription", "region": "eastus"
+        }
+        self.assertEqual(
+            self.credential.collection_vm_sizes.update_one.call_args[0][0],
+            stored_key
+        )
+
+        self.credential.collection_vm_sizes.find_one.return_value = {
+            "sizes": FAKE_SIZES, "updated_at": 1000
+        }
+        catalog = VmSizeCatalog(ttl=0, persist=True)
+        fetch = MagicMock(return_value=None)
+        self.assertEqual(
+            catalog.find(self.credential, 1, 1024, fetch)["name"],
+            "Standard_B1s"
+        )
+        self.credential.collection_vm_sizes.find_one.assert_called_with(
+            stored_key
+        )
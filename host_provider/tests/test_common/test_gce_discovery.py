@@ -0,0 +1,61 @@
+import json
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from host_provider.common.gce import DiscoveryDocuments
+
+
+FAKE_DOCUMENT = {"rootUrl": "https://fake.googleapis.com/", "resources": {}}
+
+
+def fake_build(name, version, cache=None, **kw):
+    cache.set("https://fake/discovery", json.dumps(FAKE_DOCUMENT))
+    return "FetchedService"
+
+
+@patch('googleapiclient.discovery.build_from_document',
+       return_value="CachedService")
+@patch('googleapiclient.discovery.build', side_effect=fake_build)
+class DiscoveryDocumentsTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.documents = DiscoveryDocuments(path=self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_fetch_only_once(self, build, build_from_document):
+        self.assertEqual(
+            self.documents.build('compute', 'v1'), "FetchedService"
+        )
+        self.assertEqual(
+            self.documents.build('compute', 'v1'), "CachedService"
+        )
+        self.assertEqual(
+            self.documents.build('compute', 'v1'), "CachedService"
+        )
+
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(build_from_document.call_count, 2)
+        self.assertEqual(
+            build_from_document.call_args[0][0], FAKE_DOCUMENT
+        )
+
+    def test_vendored_document(self, build, build_from_document):
+        file_name = path.join(self.tmp_dir.name, 'iam.v1.json')
+        with open(file_name, 'w') as fp:
+            json.dump(FAKE_DOCUMENT, fp)
+
+        self.assertEqual(self.documents.build('iam', 'v1'), "CachedService")
+        self.assertFalse(build.called)
+        self.assertEqual(
+            build_from_document.call_args[0][0], FAKE_DOCUMENT
+        )
+
+    def test_documents_per_api(self, build, build_from_document):
+        self.documents.build('iam', 'v1')
+        self.documents.build('pubsub', 'v1')
+        self.assertEqual(build.call_count, 2)
@@ -0,0 +1,83 @@
+from socket import timeout
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from host_provider.common.gce import Backoff, OperationTimeoutError, \
+    OperationWaiter, poll
+
+
+RUNNING = {'name': 'fake_op', 'status': 'RUNNING'}
+DONE = {'name': 'fake_op', 'status': 'DONE'}
+
+
+class BackoffTestCase(TestCase):
+
+    def test_delays_grow_until_maximum(self):
+        delays = iter(Backoff(initial=1, maximum=4))
+        steps = [next(delays) for _ in range(5)]
+
+        for delay, step in zip(steps, [1, 2, 4, 4, 4]):
+            self.assertGreaterEqual(delay, step / 2)
+            self.assertLessEqual(delay, step)
+
+
+@patch('host_provider.common.gce.time.sleep')
+class PollTestCase(TestCase):
+
+    def test_return_first_truthy(self, sleep):
+        check = MagicMock(side_effect=[None, False, 'done'])
+        self.assertEqual(poll(check, 60), 'done')
+        self.assertEqual(sleep.call_count, 2)
+
+    @patch('host_provider.common.gce.time.time')
+    def test_deadline(self, fake_time, sleep):
+        fake_time.side_effect = [1000, 1010, 1061]
+        check = MagicMock(return_value=None)
+        self.assertIsNone(poll(check, 60))
+        self.assertEqual(check.call_count, 2)
+
+
+@patch('host_provider.common.gce.time.sleep')
+class OperationWaiterTestCase(TestCase):
+
+    def setUp(self):
+        self.waiter = OperationWaiter(timeout=60)
+        self.client = MagicMock()
+
+    def test_wait_zone_operation(self, sleep):
+        wait = self.client.zoneOperations().wait
+        wait().execute.side_effect = [RUNNING, timeout(), DONE]
+
+        response = self.waiter.wait(
+            self.client, 'fake_project', 'fake_op', zone='fake_zone'
+        )
+
+        self.assertEqual(response, DONE)
+        self.assertEqual(wait().execute.call_count, 3)
+        wait.assert_any_call(
+            project='fake_project', operation='fake_op', zone='fake_zone'
+        )
+
+    def test_wait_region_and_global_operation(self, sleep):
+        self.client.regionOperations().wait().execute.return_value = DONE
+        self.client.globalOperations().wait().execute.return_value = DONE
+
+        self.waiter.wait(self.client, 'fake_project', 'op', region='fake')
+        self.waiter.wait(self.client, 'fake_project', 'op')
+
+        self.assertTrue(self.client.regionOperations().wait().execute.called)
+        self.assertTrue(self.client.globalOperations().wait().execute.called)
+
+    def test_operation_required(self, sleep):
+        with self.assertRaises(EnvironmentError):
+            self.waiter.wait(self.client, 'fake_project', None)
+
+    @patch('host_provider.common.gce.time.time')
+    def test_wait_timeout(self, fake_time, sleep):
+        fake_time.side_effect = [1000, 1061]
+        self.client.zoneOperations().wait().execute.return_value = RUNNING
+
+        with self.assertRaises(OperationTimeoutError):
+            self.waiter.wait(
+                self.client, 'fake_project', 'fake_op', zone='fake_zone'
+            )
@@ -0,0 +1,62 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from host_provider.common.http import ProviderConnection, SessionPool
+
+
+class SessionPoolTestCase(TestCase):
+
+    def setUp(self):
+        self.pool = SessionPool(
+            pool_connections=2, pool_maxsize=5,
+            max_keep_alive=60, max_retries=2
+        )
+
+    def test_reuse_session(self):
+        session = self.pool.get('https://mock.com', 443)
+        self.assertIs(self.pool.get('https://mock.com', 443), session)
+        self.assertEqual(
+            self.pool.stats, {'hits': 1, 'misses': 1, 'sessions': 1}
+        )
+
+    def test_session_per_host_port_and_proxy(self):
+        session = self.pool.get('https://mock.com', 443)
+        self.assertIsNot(self.pool.get('https://other.com', 443), session)
+        self.assertIsNot(self.pool.get('http://mock.com', 8080), session)
+        self.assertIsNot(
+            self.pool.get('https://mock.com', 443, 'http://proxy:3128'),
+            session
+        )
+        self.assertEqual(self.pool.stats['misses'], 4)
+
+    def test_proxy_configured(self):
+        session = self.pool.get('https://mock.com', 443, 'http://proxy:3128')
+        self.assertEqual(session.proxies['https'], 'http://proxy:3128')
+
+    def test_adapter_configuration(self):
+        adapter = self.pool.get('https://mock.com', 443).get_adapter(
+            'https://mock.com'
+        )
+        self.assertEqual(adapter._pool_maxsize, 5)
+        self.assertEqual(adapter.max_retries.total, 2)
+
+    @patch('host_provider.common.http.time.time')
+    def test_recycle_after_keep_alive(self, fake_time):
+        fake_time.return_value = 1000
+        session = self.pool.get('https://mock.com', 443)
+        session.close = MagicMock()
+
+        fake_time.return_value = 1061
+        self.assertIsNot(self.pool.get('https://mock.com', 443), session)
+        self.assertEqual(self.pool.stats['misses'], 2)
+        self.assertFalse(session.close.called)
+
+
+class ProviderConnectionPoolTestCase(TestCase):
+
+    @patch('host_provider.common.http.session_pool', new_callable=SessionPool)
+    def test_connections_share_session(self, session_pool):
+        first = ProviderConnection(host='mock.com', port=443)
+        second = ProviderConnection(host='mock.com', port=443)
+        self.assertIs(first.session, second.session)
+        self.assertEqual(session_pool.hits, 1)
@@ -0,0 +1,205 @@
+import json
+import os
+from datetime import datetime, timedelta
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from peewee import SqliteDatabase
+from playhouse.test_utils import test_database
+
+from host_provider.common.jobs import JobPool
+from host_provider.main import app
+from host_provider.models import Job
+
+
+class SyncExecutor(object):
+
+    def submit(self, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+
+@patch('host_provider.common.jobs.Thread', new=MagicMock())
+@patch('host_provider.common.jobs.mysql_db', new=MagicMock())
+@patch('host_provider.common.jobs.Job.get')
+class JobPoolTestCase(TestCase):
+
+    def setUp(self):
+        self.pool = JobPool(max_workers=1)
+        self.pool._executor = SyncExecutor()
+        self.job = MagicMock(id=11)
+
+    def test_job_done(self, job_get):
+        job_get.return_value = self.job
+        target = MagicMock(return_value={'address': '10.0.0.1', 'id': 1})
+
+        self.pool.submit(self.job, target, 'fake_arg', fake_kw=1)
+
+        target.assert_called_once_with('fake_arg', fake_kw=1)
+        self.assertTrue(self.job.start.called)
+        self.job.finish.assert_called_once_with(address='10.0.0.1', id=1)
+        self.assertFalse(self.job.fail.called)
+
+    def test_job_failed(self, job_get):
+        job_get.return_value = self.job
+        target = MagicMock(side_effect=Exception('Quota exceeded'))
+
+        self.pool.submit(self.job, target)
+
+        self.job.fail.assert_called_once_with('Quota exceeded')
+        self.assertFalse(self.job.finish.called)
+
+    def test_job_not_pending(self, job_get):
+        job_get.return_value = self.job
+        self.job.start.return_value = False
+        target = MagicMock()
+
+        self.pool.submit(self.job, target)
+
+        self.assertFalse(target.called)
+        self.assertFalse(self.job.finish.called)
+        self.assertEqual(self.pool._active, set())
+
+    def test_heartbeat_started_once(self, job_get):
+        job_get.return_value = self.job
+        self.pool.submit(self.job, MagicMock())
+        self.pool.submit(self.job, MagicMock())
+
+        self.assertEqual(self.pool._heartbeat_thread.start.call_count, 1)
+
+
+@patch('host_provider.common.jobs.socket.gethostname',
+       new=MagicMock(return_value='fake_host'))
+class JobRecoverTestCase(TestCase):
+
+    def setUp(self):
+        self.pool = JobPool(max_workers=1, timeout=60)
+
+    def job(self, owner, status=Job.RUNNING, age=0):
+        job = Job.create(
+            action='create_host', provider='gce', environment='dev',
+            owner=owner, status=status
+        )
+        updated_at = datetime.now() - timedelta(seconds=age)
+        Job.update(updated_at=updated_at).where(Job.id == job.id).execute()
+        return job.id
+
+    def status_of(self, job_id):
+        return Job.get(id=job_id).status
+
+    @patch.object(JobPool, 'is_running', side_effect=lambda pid: pid == 2)
+    def test_recover(self, is_running):
+        with test_database(SqliteDatabase(':memory:'), [Job]):
+            stopped = self.job('fake_host:1', Job.PENDING)
+            alive = self.job('fake_host:2')
+            own = self.job('fake_host:{}'.format(os.getpid()))
+            other_host = self.job('other_host:1')
+            stale = self.job('other_host:1', age=61)
+            done = self.job('fake_host:1', Job.DONE)
+
+            self.assertEqual(
+                sorted(self.pool.recover()), sorted([stopped, own, stale])
+            )
+            self.assertEqual(self.status_of(stopped), Job.FAILED)
+            self.assertEqual(self.status_of(alive), Job.RUNNING)
+            self.assertEqual(self.status_of(other_host), Job.RUNNING)
+            self.assertEqual(self.status_of(done), Job.DONE)
+
+    def test_touch(self):
+        with test_database(SqliteDatabase(':memory:'), [Job]):
+            active = self.job('other_host:1', age=61)
+            other = self.job('other_host:1', age=61)
+            self.pool._active = {active}
+            self.pool.touch()
+
+            self.assertEqual(self.pool.recover(), [other])
+            self.assertEqual(self.status_of(active), Job.RUNNING)
+
+    def test_owner(self):
+        self.assertEqual(self.pool.owner, 'fake_host:{}'.format(os.getpid()))
+
+
+class JobModelTestCase(TestCase):
+
+    def test_finish_only_running(self):
+        with test_database(SqliteDatabase(':memory:'), [Job]):
+            job = Job.create(
+                action='create_host', provider='gce', environment='dev'
+            )
+            self.assertTrue(job.start())
+            self.assertFalse(job.start())
+
+            Job.update(status=Job.FAILED).where(Job.id == job.id).execute()
+            self.assertFalse(job.finish(address='10.0.0.1'))
+            self.assertEqual(Job.get(id=job.id).status, Job.FAILED)
+            self.assertIsNone(Job.get(id=job.id).result)
+
+    def test_to_dict(self):
+        job = Job()
+        job._data = {'id': 11, 'status': Job.DONE, 'result': None}
+        job.result = json.dumps({'address': '10.0.0.1', 'id': 1})
+
+        self.assertEqual(
+            job.to_dict['result'], {'address': '10.0.0.1', 'id': 1}
+        )
+
+
+class JobViewsTestCase(TestCase):
+
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+
+    @patch('host_provider.main.build_provider', new=MagicMock())
+    @patch('host_provider.main.job_pool')
+    @patch('host_provider.main.Job.save')
+    def test_create_host_async(self, job_save, job_pool):
+        resp = self.app.post(
+            '/gce/dev/host/new',
+            data=json.dumps({
+                'group': 'fake_group', 'name': 'fake_name', 'cpu': 1,
+                'memory': 1024, 'engine': 'redis', 'async': True
+            }),
+            content_type='application/json'
+        )
+
+        self.assertEqual(resp.status_code, 202)
+        self.assertTrue(job_save.called)
+        job, target = job_pool.submit.call_args[0][:2]
+        self.assertEqual(job.action, 'create_host')
+        self.assertEqual(job.provider, 'gce')
+        self.assertEqual(job.environment, 'dev')
+        self.assertEqual(job.owner, job_pool.owner)
+
+    @patch('host_provider.main.job_pool')
+    @patch('host_provider.main.Job.save')
+    def test_create_host_async_invalid_provider(self, job_save, job_pool):
+        resp = self.app.post(
+            '/fake_provider/dev/host/new',
+            data=json.dumps({
+                'group': 'fake_group', 'name': 'fake_name', 'cpu': 1,
+                'memory': 1024, 'engine': 'redis', 'async': True
+            }),
+            content_type='application/json'
+        )
+
+        self.assertEqual(resp.status_code, 500)
+        self.assertFalse(job_save.called)
+        self.assertFalse(job_pool.submit.called)
+
+    @patch('host_provider.main.Job.get')
+    def test_get_job(self, job_get):
+        job = Job()
+        job._data = {'id': 11, 'status': Job.RUNNING}
+        job_get.return_value = job
+
+        resp = self.app.get('/jobs/11')
+
+        self.assertEqual(resp.status_code, 200)
+        content = json.loads(resp.data.decode("utf-8"))
+        self.assertEqual(content['status'], Job.RUNNING)
+        self.assertIsNone(content['result'])
+
+    @patch('host_provider.main.Job.get', side_effect=Job.DoesNotExist)
+    def test_job_not_found(self, job_get):
+        resp = self.app.get('/jobs/11')
+        self.assertEqual(resp.status_code, 404)
@@ -0,0 +1,131 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from kubernetes.client.rest import ApiException
+
+from host_provider.common.k8s import PodInformer, PodInformers
+
+
+def fake_pod(name, resource_version='1'):
+    pod = MagicMock()
+    pod.metadata.name = name
+    pod.metadata.resource_version = resource_version
+    return pod
+
+
+def fake_pod_list(*pods):
+    pod_list = MagicMock(items=list(pods))
+    pod_list.metadata.resource_version = '10'
+    return pod_list
+
+
+class PodInformerTestCase(TestCase):
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.client.list_namespaced_pod.return_value = fake_pod_list(
+            fake_pod('db-1-0'), fake_pod('db-2-0')
+        )
+        self.informer = PodInformer(
+            lambda: self.client, 'fake_namespace', resync=60, max_pods=3
+        )
+
+    def test_not_synced(self):
+        self.assertIsNone(self.informer.get('db-1-0'))
+
+    def test_sync(self):
+        self.informer.sync(self.client)
+        self.assertEqual(self.informer.get('db-1-0').metadata.name, 'db-1-0')
+        self.assertEqual(self.informer.resource_version, '10')
+        self.client.list_namespaced_pod.assert_called_once_with(
+            'fake_namespace'
+        )
+
+    def test_apply_events(self):
+        self.informer.sync(self.client)
+        modified = fake_pod('db-1-0', '11')
+        self.informer.apply('MODIFIED', modified)
+        self.informer.apply('DELETED', fake_pod('db-2-0', '12'))
+
+        self.assertIs(self.informer.get('db-1-0'), modified)
+        self.assertIsNone(self.informer.get('db-2-0'))
+        self.assertEqual(self.informer.resource_version, '12')
+
+    def test_bounded(self):
+        self.informer.sync(self.client)
+        for name in ('db-3-0', 'db-4-0'):
+            self.informer.apply('ADDED', fake_pod(name))
+
+        self.assertEqual(len(self.informer), 3)
+        self.assertIsNone(self.informer.get('db-1-0'))
+        self.assertIsNotNone(self.informer.get('db-4-0'))
+
+    @patch('host_provider.common.k8s.time.time')
+    def test_stale(self, fake_time):
+        fake_time.return_value = 1000
+        self.informer.sync(self.client)
+
+        fake_time.return_value = 1121
+        self.assertIsNone(self.informer.get('db-1-0'))
+
+    @patch('host_provider.common.k8s.watch.Watch')
+    def test_watch_expired(self, watch_mock):
+        watch_mock().stream.side_effect = ApiException(status=410)
+        self.informer.sync(self.client)
+        self.informer.watch(self.client)
+
+        watch_mock().stream.side_effect = ApiException(status=500)
+        with self.assertRaises(ApiException):
+            self.informer.watch(self.client)
+
+    @patch('host_provider.common.k8s.watch.Watch')
+    def test_stops_on_error(self, watch_mock):
+        watch_mock().stream.side_effect = ApiException(status=401)
+        self.informer._run()
+
+        self.assertTrue(self.informer.stopped)
+        self.assertIsNone(self.informer.get('db-1-0'))
+
+
+@patch('host_provider.common.k8s.PodInformer.start')
+class PodInformersTestCase(TestCase):
+
+    def setUp(self):
+        self.informers = PodInformers(retry_interval=30, max_informers=2)
+
+    def get(self, namespace, token='token-a'):
+        return self.informers.get('endpoint', namespace, token, MagicMock())
+
+    def test_informer_per_namespace(self, start):
+        informer = self.get('ns-1')
+        self.assertIs(self.get('ns-1'), informer)
+        self.assertIsNot(self.get('ns-2'), informer)
+        self.assertEqual(start.call_count, 3)
+
+    def test_informer_per_token(self, start):
+        informer = self.get('ns-1')
+        self.assertIsNot(self.get('ns-1', 'token-b'), informer)
+        self.assertNotIn(
+            'token-a', [key[2] for key in self.informers._informers]
+        )
+
+    def test_least_recently_used_stopped(self, start):
+        first = self.get('ns-1')
+        second = self.get('ns-2')
+        self.get('ns-1')
+        self.get('ns-3')
+
+        self.assertEqual(len(self.informers), 2)
+        self.assertTrue(second.stopped)
+        self.assertFalse(first.stopped)
+
+    @patch('host_provider.common.k8s.time.time')
+    def test_replace_stopped(self, fake_time, start):
+        fake_time.return_value = 1000
+        informer = self.get('ns-1')
+        informer.stop()
+
+        fake_time.return_value = 1010
+        self.assertIs(self.get('ns-1'), informer)
+        fake_time.return_value = 1031
+        self.assertIsNot(self.get('ns-1'), informer)
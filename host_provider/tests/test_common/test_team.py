@@ -0,0 +1,115 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from host_provider.common.team import CachedTeamClient, TeamCache, \
+    get_dbaas_team
+from host_provider.settings import TEAM_API_TIMEOUT
+from .test_azure_token import SyncThread
+
+
+KEY = ("https://fake.team.api/", "fake_team")
+FAKE_TEAM = {
+    "business_service": "fake_service", "client": "fake_client",
+    "slug": "fake_team", "identifier": "fake_id"
+}
+
+
+@patch('host_provider.common.team.Thread', new=SyncThread)
+@patch('host_provider.common.team.time.time')
+class TeamCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.cache = TeamCache(ttl=60, max_stale=600)
+
+    def test_fetch_once(self, fake_time):
+        fake_time.return_value = 1000
+        fetch = MagicMock(return_value=FAKE_TEAM)
+
+        for _ in range(3):
+            self.assertEqual(self.cache.get(KEY, fetch), FAKE_TEAM)
+        fetch.assert_called_once_with()
+
+    def test_serve_stale_while_refreshing(self, fake_time):
+        fake_time.return_value = 1000
+        fetch = MagicMock(side_effect=[{"slug": "old"}, {"slug": "new"}])
+        self.cache.get(KEY, fetch)
+
+        fake_time.return_value = 1061
+        self.assertEqual(self.cache.get(KEY, fetch), {"slug": "old"})
+        self.assertEqual(self.cache.get(KEY, fetch), {"slug": "new"})
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_refresh_error_keeps_team(self, fake_time):
+        fake_time.return_value = 1000
+        fetch = MagicMock(side_effect=[FAKE_TEAM, Exception("Timeout")])
+        self.cache.get(KEY, fetch)
+
+        fake_time.return_value = 1061
+        self.assertEqual(self.cache.get(KEY, fetch), FAKE_TEAM)
+        self.assertEqual(self.cache._refreshing, set())
+
+    def test_too_stale_fetch_again(self, fake_time):
+        fake_time.return_value = 1000
+        fetch = MagicMock(side_effect=[{"slug": "old"}, {"slug": "new"}])
+        self.cache.get(KEY, fetch)
+
+        fake_time.return_value = 1661
+        self.assertEqual(self.cache.get(KEY, fetch), {"slug": "new"})
+
+
+@patch('host_provider.common.team.team_cache', new_callable=TeamCache)
+class DbaasTeamTestCase(TestCase):
+
+    @patch('host_provider.common.team.DBAAS_TEAM_API_URL', new=None)
+    def test_dbaas_team_api_not_configured(self, team_cache):
+        self.assertIsNone(get_dbaas_team("fake_team"))
+
+    @patch('host_provider.common.team.DBAAS_TEAM_API_URL',
+           new="https://fake.team.api/")
+    @patch('host_provider.common.team.session_pool')
+    def test_pooled_session_with_timeout(self, session_pool, team_cache):
+        get = session_pool.get().get
+        get.return_value.status_code = 200
+        get.return_value.json.return_value = FAKE_TEAM
+
+        self.assertEqual(get_dbaas_team("fake_team"), FAKE_TEAM)
+        self.assertEqual(get_dbaas_team("fake_team"), FAKE_TEAM)
+
+        get.assert_called_once()
+        self.assertEqual(
+            get.call_args[0][0], "https://fake.team.api/fake_team"
+        )
+        self.assertIn('timeout', get.call_args[1])
+
+    @patch('host_provider.common.team.DBAAS_TEAM_API_URL',
+           new="https://fake.team.api/")
+    @patch('host_provider.common.team.session_pool')
+    def test_team_not_found(self, session_pool, team_cache):
+        session_pool.get().get.return_value.status_code = 404
+        self.assertIsNone(get_dbaas_team("fake_team"))
+
+    @patch('host_provider.common.team.session_pool')
+    def test_team_client_cached(self, session_pool, team_cache):
+        get = session_pool.get().get
+        get.return_value.ok = True
+        get.return_value.json.return_value = {"slug": "fake_team"}
+
+        for _ in range(3):
+            client = CachedTeamClient(
+                api_url="https://team.api", team_name="fake_team"
+            )
+            labels = client.make_labels()
+            self.assertEqual(labels["team_slug_name"], "fake_team")
+        get.assert_called_once_with(
+            "https://team.api/slug/fake_team", timeout=TEAM_API_TIMEOUT
+        )
+        session_pool.get.assert_called_with("https://team.api", None)
+
+    @patch('host_provider.common.team.session_pool')
+    def test_team_client_not_found(self, session_pool, team_cache):
+        session_pool.get().get.return_value.ok = False
+        client = CachedTeamClient(
+            api_url="https://team.api", team_name="fake_team"
+        )
+        with self.assertRaises(Exception):
+            client.team
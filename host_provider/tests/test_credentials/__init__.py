@@ -28,7 +28,7 @@ class FakeMongoDB(object):
         self.ids.append(new_id)
         return InsertInfo(inserted_id=new_id)
 
-    def find_one(self, filter):
+    def find_one(self, filter, projection=None):
         for line in self.metadata:
             for key, value in filter.items():
                 if line.get(key, None) != value:
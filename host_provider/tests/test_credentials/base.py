@@ -2,7 +2,8 @@ from collections import OrderedDict
 from unittest.mock import patch
 from host_provider.settings import MONGODB_HOST, MONGODB_PORT, MONGODB_USER, \
     MONGODB_PWD
-from host_provider.credentials.base import CredentialAdd, CredentialBase
+from host_provider.credentials.base import CredentialAdd, CredentialBase, \
+    credential_contents
 from host_provider.tests.test_credentials import CredentialAddFake, CredentialBaseFake, \
     FakeMongoDB
 
@@ -18,6 +19,7 @@ class TestBaseProvider(object):
 
     def tearDown(self):
         FakeMongoDB.clear()
+        credential_contents.clear()
 
     def test_base_content(self):
         credential_add = CredentialAddFake(
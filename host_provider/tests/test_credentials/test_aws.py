@@ -4,6 +4,8 @@ from host_provider.credentials.aws import CredentialAWS, \
     CredentialAddAWS
 from host_provider.providers.aws import AWSProvider
 from host_provider.tests.test_credentials.base import FakeMongoDB
+from host_provider.tests.test_credentials.test_zones import \
+    FakeZonesCollection
 
 
 ENVIRONMENT = "dev"
@@ -61,28 +63,20 @@ class TestAWSProvider(TestCase):
         self.assertEqual(self.credential.get_next_zone_from("second"), "third")
         self.assertEqual(self.credential.get_next_zone_from("third"), "first")
 
-    @patch(
-        'host_provider.providers.aws.CredentialAWS.collection_last'
-    )
-    def test_get_zone_environment(self, last_collection):
+    def test_get_zone_environment(self):
         self._force_content()
-        self.fake_mongo.metadata.append({
+        self.credential._db = {"ec2_zones_last": FakeZonesCollection({
             "latestUsed": True,
             "environment": self.credential.environment,
             "zone": "second"
-        })
-        last_collection.find_one = self.fake_mongo.find_one
+        })}
         self.assertEqual(self.credential._get_zone("new_group"), "third")
 
-    @patch(
-        'host_provider.providers.aws.CredentialAWS.collection_last'
-    )
-    def test_get_zone_infra(self, last_collection):
+    def test_get_zone_infra(self):
         self._force_content()
-        self.fake_mongo.metadata.append({
+        self.credential._db = {"ec2_zones_last": FakeZonesCollection({
             "group": "fake_group",
             "environment": self.credential.environment,
             "zone": "first"
-        })
-        last_collection.find_one = self.fake_mongo.find_one
+        })}
         self.assertEqual(self.credential._get_zone("fake_group"), "second")
@@ -4,6 +4,8 @@ from host_provider.credentials.cloudstack import CredentialCloudStack, \
     CredentialAddCloudStack
 from host_provider.providers.cloudstack import CloudStackProvider
 from host_provider.tests.test_credentials.base import FakeMongoDB
+from host_provider.tests.test_credentials.test_zones import \
+    FakeZonesCollection
 
 
 ENVIRONMENT = "dev"
@@ -85,28 +87,88 @@ class TestCloudStackProvider(TestCase):
         self.assertEqual(self.credential.get_next_zone_from("second"), "third")
         self.assertEqual(self.credential.get_next_zone_from("third"), "first")
 
-    @patch(
-        'host_provider.providers.cloudstack.CredentialCloudStack.collection_last'
-    )
-    def test_get_zone_environment(self, last_collection):
+    def test_get_zone_environment(self):
         self._force_content()
-        self.fake_mongo.metadata.append({
+        self.credential._db = {"cloudstack_zones_last": FakeZonesCollection({
             "latestUsed": True,
             "environment": self.credential.environment,
             "zone": "second"
-        })
-        last_collection.find_one = self.fake_mongo.find_one
+        })}
         self.assertEqual(self.credential._get_zone("new_group"), "third")
 
-    @patch(
-        'host_provider.providers.cloudstack.CredentialCloudStack.collection_last'
-    )
-    def test_get_zone_infra(self, last_collection):
+    def test_get_zone_infra(self):
         self._force_content()
-        self.fake_mongo.metadata.append({
+        self.credential._db = {"cloudstack_zones_last": FakeZonesCollection({
             "group": "fake_group",
             "environment": self.credential.environment,
             "zone": "first"
-        })
-        last_collection.find_one = self.fake_mongo.find_one
+        })}
         self.assertEqual(self.credential._get_zone("fake_group"), "second")
+
+    def test_get_next_zone_skips_inactive(self):
+        self._force_content()
+        self.credential._content["zones"]["second"]["active"] = False
+        self.assertEqual(self.credential.get_next_zone_from("first"), "third")
+        self.assertEqual(
+            self.credential.get_next_zone_from("unknown", 1), "third"
+        )
+        self.assertEqual(len(self.credential.zones), 2)
+        self.assertEqual(len(self.credential.all_zones), 3)
+
+    def test_zone_by_name_and_id(self):
+        self._force_content()
+        self.credential._content["zones"]["second"]["id"] = "second-id"
+        self.credential.zone = "second zone"
+        self.assertEqual(self.credential.zone, "second")
+        self.assertEqual(
+            self.credential.zone_by_id("second-id"), "second zone"
+        )
+
+    def test_zones_indexed_once_per_content(self):
+        self._force_content()
+        index = self.credential._zone_index
+        self.credential.get_next_zone_from("first")
+        self.assertIs(self.credential._zone_index, index)
+
+        self._force_content()
+        self.assertIsNot(self.credential._zone_index, index)
+
+    def _force_collection(self):
+        self._force_content()
+        collection = Mock(wraps=FakeZonesCollection())
+        collection.full_name = "host_provider.cloudstack_zones_last_fake"
+        self.credential._db = {"cloudstack_zones_last": collection}
+        return collection
+
+    @patch('host_provider.credentials.cloudstack.Host.filter')
+    def test_before_create_host_skips_used_zones(self, host_filter):
+        collection = self._force_collection()
+        host_filter.return_value = [Mock(zone="first"), Mock(zone="second")]
+
+        self.credential.before_create_host("fake_group")
+        self.assertEqual(self.credential.zone, "third")
+        self.assertEqual(collection.update_one.call_count, 1)
+        self.assertEqual(
+            collection.find_one({"group": "fake_group"})["count"], 3
+        )
+
+    @patch('host_provider.credentials.cloudstack.Host.filter')
+    def test_before_create_host_retry(self, host_filter):
+        self._force_collection()
+        host_filter.return_value = []
+
+        self.credential.before_create_host("fake_group")
+        self.assertEqual(self.credential.zone, "first")
+        self.credential.release_zone("fake_group")
+        self.credential.before_create_host("fake_group")
+        self.assertEqual(self.credential.zone, "second")
+        self.credential.after_create_host("fake_group")
+
+        self.assertEqual(self.credential._get_zone("fake_group"), "third")
+
+    def test_after_create_host_records_given_zone(self):
+        self._force_collection()
+        self.credential.zone = "second zone"
+        self.credential.after_create_host("fake_group")
+
+        self.assertEqual(self.credential._get_zone("fake_group"), "third")
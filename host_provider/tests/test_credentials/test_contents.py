@@ -0,0 +1,180 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from pymongo.errors import OperationFailure
+
+from host_provider.credentials.base import CredentialContents, \
+    credential_contents
+from host_provider.tests.test_common.test_azure_token import SyncThread
+from host_provider.tests.test_credentials import CredentialAddFake, \
+    CredentialBaseFake, FakeMongoDB
+
+
+DOCUMENT = {
+    "_id": "fake-id", "provider": "fake", "environment": "dev",
+    "version": "first", "fake": "content"
+}
+
+
+class FakeCredentials(object):
+
+    def __init__(self, *documents):
+        self.documents = list(documents)
+        self.reads = []
+
+    def find_one(self, query, projection=None):
+        self.reads.append(projection)
+        for document in self.documents:
+            if all(document.get(k) == v for k, v in query.items()):
+                if projection:
+                    return {k: document.get(k) for k in projection}
+                return document
+        return None
+
+    def watch(self):
+        raise NotImplementedError
+
+
+class CredentialContentsTestCase(TestCase):
+
+    def setUp(self):
+        self.contents = CredentialContents(check_interval=30)
+        self.collection = FakeCredentials(dict(DOCUMENT))
+        fake_time = patch('host_provider.credentials.base.time.time')
+        self.fake_time = fake_time.start()
+        self.addCleanup(fake_time.stop)
+        self.now(1000)
+
+    def now(self, value):
+        self.fake_time.return_value = value
+
+    def get(self, environment="dev"):
+        return self.contents.get(self.collection, "fake", environment)
+
+    def test_loaded_once(self):
+        self.assertEqual(self.get().content["fake"], "content")
+        self.assertEqual(self.get().content["fake"], "content")
+        self.assertEqual(self.collection.reads, [None])
+        self.assertEqual(
+            self.contents.stats, {'hits': 1, 'misses': 1, 'documents': 1}
+        )
+
+    def test_same_version_after_interval(self):
+        self.get()
+        self.now(1031)
+        self.assertEqual(self.get().content["fake"], "content")
+        self.assertEqual(self.collection.reads, [None, {'version': True}])
+
+        self.get()
+        self.assertEqual(len(self.collection.reads), 2)
+        self.assertEqual(self.contents.hits, 2)
+
+    def test_new_version_reloaded(self):
+        self.get()
+        self.collection.documents = [
+            dict(DOCUMENT, version="second", fake="changed")
+        ]
+        self.assertEqual(self.get().content["fake"], "content")
+
+        self.now(1031)
+        self.assertEqual(self.get().content["fake"], "changed")
+        self.assertEqual(self.contents.misses, 2)
+
+    def test_without_version_reloaded(self):
+        self.collection.documents = [
+            {"provider": "fake", "environment": "dev"}
+        ]
+        self.get()
+        self.now(1031)
+        self.get()
+        self.assertEqual(self.collection.reads, [None, None])
+
+    def test_missing_not_kept(self):
+        self.assertIsNone(self.get("prod"))
+        self.assertIsNone(self.get("prod"))
+        self.assertEqual(self.contents.misses, 2)
+        self.assertEqual(self.contents.stats['documents'], 0)
+
+    def test_invalidate(self):
+        self.get()
+        self.get("prod")
+        self.contents.invalidate("other")
+        self.assertEqual(self.contents.stats['documents'], 1)
+
+        self.contents.invalidate("fake", "dev")
+        self.get()
+        self.assertEqual(self.contents.misses, 3)
+
+    def test_change_drops_document(self):
+        self.get()
+        self.contents.apply({
+            "operationType": "update", "documentKey": {"_id": "other-id"}
+        })
+        self.assertEqual(self.contents.stats['documents'], 1)
+
+        self.contents.apply({
+            "operationType": "update", "documentKey": {"_id": "fake-id"}
+        })
+        self.assertEqual(self.contents.stats['documents'], 0)
+
+
+class ZonedCredentialFake(CredentialBaseFake):
+
+    @property
+    def _zones_field(self):
+        return self.content["zones"]
+
+
+class CredentialContentCopyTestCase(TestCase):
+
+    def tearDown(self):
+        FakeMongoDB.clear()
+        credential_contents.clear()
+
+    def test_shared_content_not_changed(self):
+        CredentialAddFake("fake", "dev", {"fake": {"info": 1}}).save()
+        first = CredentialBaseFake("fake", "dev", "redis")
+        first.content["fake"]["info"] = 2
+
+        second = CredentialBaseFake("fake", "dev", "redis")
+        self.assertEqual(second.content["fake"], {"info": 1})
+        self.assertEqual(first.content["fake"], {"info": 2})
+
+    def test_zone_index_shared(self):
+        CredentialAddFake("fake", "dev", {"zones": {
+            "first": {"active": True, "name": "first zone"},
+            "second": {"active": 1, "name": "second zone"},
+        }}).save()
+        first = ZonedCredentialFake("fake", "dev", "redis")
+        second = ZonedCredentialFake("fake", "dev", "redis")
+
+        self.assertIs(first._zone_index, second._zone_index)
+        self.assertEqual(list(second.zones), ["first", "second"])
+
+        second._content = {"zones": {}}
+        self.assertIsNot(second._zone_index, first._zone_index)
+        self.assertEqual(len(second.zones), 0)
+
+
+@patch('host_provider.credentials.base.Thread', new=SyncThread)
+class CredentialContentsChangeStreamTestCase(TestCase):
+
+    def setUp(self):
+        self.contents = CredentialContents(
+            check_interval=0, change_stream=True, retry_interval=60
+        )
+        self.collection = MagicMock(wraps=FakeCredentials(dict(DOCUMENT)))
+
+    def test_checks_without_change_streams(self):
+        self.collection.watch.side_effect = OperationFailure(
+            "The $changeStream stage is only supported on replica sets"
+        )
+        self.contents.get(self.collection, "fake", "dev")
+        self.contents.get(self.collection, "fake", "dev")
+
+        self.assertFalse(self.contents.watching)
+        self.assertEqual(self.collection.watch.call_count, 1)
+        self.assertEqual(self.contents.hits, 1)
+        self.collection.find_one.assert_called_with(
+            {'provider': 'fake', 'environment': 'dev'}, {'version': True}
+        )
@@ -0,0 +1,60 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from host_provider.credentials.base import MongoConnections, CredentialBase
+from host_provider.settings import MONGODB_DB
+
+
+@patch('host_provider.credentials.base.MongoClient')
+class MongoConnectionsTestCase(TestCase):
+
+    def setUp(self):
+        self.connections = MongoConnections(
+            max_pool_size=10, max_idle_time_ms=1000
+        )
+
+    def test_client_shared(self, mongo_client):
+        self.assertIs(self.connections.client, self.connections.client)
+        mongo_client.assert_called_once()
+        params = mongo_client.call_args[1]
+        self.assertEqual(params['maxPoolSize'], 10)
+        self.assertEqual(params['maxIdleTimeMS'], 1000)
+        self.assertFalse(params['connect'])
+
+    def test_collection_handles(self, mongo_client):
+        collection = self.connections.collection('gcp_zones_last')
+        self.assertIs(
+            self.connections.collection('gcp_zones_last'), collection
+        )
+        mongo_client().__getitem__.assert_called_once_with(MONGODB_DB)
+
+    @patch('host_provider.credentials.base.os.getpid')
+    def test_new_client_after_fork(self, getpid, mongo_client):
+        getpid.return_value = 100
+        self.connections.collection('credential')
+        self.connections.collection('credential')
+        self.assertEqual(mongo_client.call_count, 1)
+
+        getpid.return_value = 101
+        self.connections.collection('credential')
+        self.assertEqual(mongo_client.call_count, 2)
+
+
+@patch('host_provider.credentials.base.mongo_connections')
+class CredentialConnectionTestCase(TestCase):
+
+    def test_credentials_share_connections(self, mongo_connections):
+        for environment in ('dev', 'prod'):
+            credential = CredentialBase('fake', environment, 'redis')
+            self.assertIs(
+                credential.credential,
+                mongo_connections.collection.return_value
+            )
+        mongo_connections.collection.assert_called_with('credential')
+        self.assertEqual(mongo_connections.collection.call_count, 2)
+
+    def test_own_database(self, mongo_connections):
+        credential = CredentialBase('fake', 'dev', 'redis')
+        credential._db = {'credential': 'fake_collection'}
+        self.assertEqual(credential.credential, 'fake_collection')
+        self.assertFalse(mongo_connections.collection.called)
@@ -56,5 +56,15 @@ class TestRules(TestCase):
         )
         self.assertDictEqual(
             mock_credential.update.call_args[0][1],
-            {'fake': 1}
+            {'fake': 1, 'version': mock.ANY}
         )
+
+    @mock.patch('host_provider.main.credential_contents')
+    def test_cache_stats(self, credential_contents):
+        credential_contents.stats = {'hits': 3, 'misses': 1, 'documents': 1}
+        resp = self.app.get('/stats')
+
+        self.assertEqual(resp.status_code, 200)
+        content = json.loads(resp.data.decode("utf-8"))
+        self.assertEqual(content['credentials']['hits'], 3)
+        self.assertIn('sessions', content['http_sessions'])
@@ -0,0 +1,248 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from unittest import TestCase, skipUnless
+from unittest.mock import MagicMock
+
+from pymongo import MongoClient, ReturnDocument
+from pymongo.errors import PyMongoError
+
+from host_provider.credentials.base import ZoneAllocator, ZoneIndex
+from host_provider.settings import MONGODB_HOST, MONGODB_PORT
+
+
+ZONES = ZoneIndex({
+    "first": {"active": True, "name": "first zone"},
+    "second": {"active": True, "name": "second zone"},
+    "inactive": {"active": False, "name": "inactive zone"},
+    "third": {"active": True, "name": "third zone"},
+})
+
+
+def local_mongod():
+    client = MongoClient(
+        MONGODB_HOST, MONGODB_PORT, serverSelectionTimeoutMS=500
+    )
+    try:
+        client.admin.command('ping')
+    except PyMongoError:
+        return None
+    return client
+
+
+MONGOD = local_mongod()
+
+
+class FakeZonesCollection(object):
+
+    full_name = "host_provider.zones_last_fake"
+
+    def __init__(self, *documents):
+        self.documents = [dict(document) for document in documents]
+        self.indexes = []
+        self.lock = Lock()
+
+    def _matches(self, document, query):
+        for key, value in query.items():
+            if isinstance(value, dict) and "$exists" in value:
+                if (key in document) != value["$exists"]:
+                    return False
+            elif document.get(key) != value:
+                return False
+        return True
+
+    def create_index(self, keys, **kw):
+        self.indexes.append((keys, kw))
+
+    def find_one(self, query):
+        for document in self.documents:
+            if self._matches(document, query):
+                return document
+        return None
+
+    def _update(self, query, update, upsert):
+        document = self.find_one(query)
+        if document is None:
+            if not upsert:
+                return None, None
+            document = {
+                key: value for key, value in query.items()
+                if not isinstance(value, dict)
+            }
+            document.update(update.get("$setOnInsert", {}))
+            self.documents.append(document)
+            before = None
+        else:
+            before = dict(document)
+        for key, value in update.get("$inc", {}).items():
+            document[key] = document.get(key, 0) + value
+        for key, value in update.get("$max", {}).items():
+            document[key] = max(document.get(key, value), value)
+        document.update(update.get("$set", {}))
+        return before, document
+
+    def find_one_and_update(self, query, update, upsert=False,
+                            return_document=ReturnDocument.BEFORE):
+        with self.lock:
+            before, after = self._update(query, update, upsert)
+            if return_document == ReturnDocument.AFTER:
+                return after and dict(after)
+            return before
+
+    def update_one(self, query, update, upsert=False):
+        with self.lock:
+            self._update(query, update, upsert)
+
+
+class ZoneAllocatorTestCase(TestCase):
+
+    def allocator(self, *documents):
+        self.collection = FakeZonesCollection(*documents)
+        return ZoneAllocator(self.collection, "dev", ZONES)
+
+    def zones(self, allocator, *groups):
+        return [allocator.allocate(group).zone for group in groups]
+
+    def test_round_robin_per_group(self):
+        allocator = self.allocator()
+        self.assertEqual(
+            self.zones(allocator, *["group-a"] * 4),
+            ["first", "second", "third", "first"]
+        )
+
+    def test_new_groups_follow_environment(self):
+        allocator = self.allocator()
+        self.assertEqual(
+            self.zones(allocator, "group-a", "group-b", "group-a", "group-c"),
+            ["first", "second", "second", "third"]
+        )
+
+    def test_legacy_documents(self):
+        allocator = self.allocator(
+            {"latestUsed": True, "environment": "dev", "zone": "second"},
+            {"group": "group-a", "environment": "dev", "zone": "third"},
+        )
+        self.assertEqual(
+            self.zones(allocator, "group-a", "group-b", "group-a"),
+            ["first", "third", "second"]
+        )
+        self.assertEqual(
+            self.collection.find_one({"group": "group-a"}),
+            {"group": "group-a", "environment": "dev",
+             "zone": "third", "base": 3, "count": 2}
+        )
+
+    def test_one_round_trip_for_known_group(self):
+        collection = MagicMock(wraps=FakeZonesCollection(
+            {"group": "group-a", "environment": "dev", "base": 1, "count": 1}
+        ))
+        collection.full_name = "host_provider.zones_last_known"
+        allocator = ZoneAllocator(collection, "dev", ZONES)
+
+        self.assertEqual(allocator.allocate("group-a").zone, "third")
+        self.assertEqual(
+            [name for name, _, _ in collection.method_calls],
+            ["create_index", "find_one_and_update"]
+        )
+
+    def test_indexed_once(self):
+        self.allocator()
+        ZoneAllocator._indexed.discard(self.collection.full_name)
+        allocator = ZoneAllocator(self.collection, "dev", ZONES)
+        allocator.allocate("group-a")
+        allocator.allocate("group-b")
+
+        self.assertEqual(self.collection.indexes, [(
+            [("group", 1), ("environment", 1)], {"unique": True}
+        )])
+
+    def test_release(self):
+        allocator = self.allocator()
+        allocation = allocator.allocate("group-a")
+        allocator.release(allocation)
+        self.assertEqual(allocator.allocate("group-a").zone, "first")
+
+    def test_release_after_other_allocation(self):
+        allocator = self.allocator()
+        allocation = allocator.allocate("group-a")
+        allocator.allocate("group-a")
+        allocator.release(allocation)
+        self.assertEqual(allocator.allocate("group-a").zone, "third")
+
+    def test_advance(self):
+        allocator = self.allocator()
+        allocation = allocator.advance(allocator.allocate("group-a"), 1)
+        self.assertEqual(allocation.zone, "second")
+        self.assertEqual(allocator.allocate("group-a").zone, "third")
+
+    def test_record(self):
+        allocator = self.allocator()
+        allocator.allocate("group-a")
+        allocator.record("group-a", "third")
+        allocator.record("group-b", "second")
+        self.assertEqual(
+            self.zones(allocator, "group-a", "group-b"), ["first", "third"]
+        )
+
+    def test_record_new_group_moves_environment(self):
+        allocator = self.allocator()
+        allocator.record("group-a", "second")
+        self.assertEqual(allocator.allocate("group-b").zone, "third")
+
+        allocator.record("group-a", "first")
+        self.assertEqual(allocator.allocate("group-c").zone, "first")
+
+    def test_no_active_zone(self):
+        allocator = ZoneAllocator(
+            FakeZonesCollection(), "dev", ZoneIndex({})
+        )
+        with self.assertRaises(Exception):
+            allocator.allocate("group-a")
+
+
+def parallel_allocations(allocator, group, total):
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        return Counter(executor.map(
+            lambda _: allocator.allocate(group).zone, range(total)
+        ))
+
+
+class ZoneAllocatorParallelTestCase(TestCase):
+
+    def test_new_group(self):
+        collection = FakeZonesCollection()
+        allocator = ZoneAllocator(collection, "dev", ZONES)
+
+        self.assertEqual(
+            parallel_allocations(allocator, "group-a", 90),
+            {"first": 30, "second": 30, "third": 30}
+        )
+        self.assertEqual(
+            collection.find_one({"group": "group-a"})["count"], 90
+        )
+
+
+@skipUnless(MONGOD, "needs a local mongod")
+class ZoneAllocatorConcurrencyTestCase(TestCase):
+
+    def setUp(self):
+        self.collection = MONGOD.host_provider_test.zones_last_test
+        self.collection.drop()
+        ZoneAllocator._indexed.discard(self.collection.full_name)
+
+    def tearDown(self):
+        self.collection.drop()
+
+    def test_new_group(self):
+        allocator = ZoneAllocator(self.collection, "dev", ZONES)
+
+        self.assertEqual(
+            parallel_allocations(allocator, "group-a", 90),
+            {"first": 30, "second": 30, "third": 30}
+        )
+        self.assertEqual(
+            self.collection.count({"group": "group-a"}), 1
+        )
+        self.assertEqual(
+            self.collection.find_one({"group": "group-a"})["count"], 90
+        )
@@ -0,0 +1,79 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from peewee import ForeignKeyField
+from playhouse.pool import PooledMySQLDatabase
+
+from host_provider.main import app
+from host_provider.models import PooledPyMySQLDatabase, build_database
+
+
+FAKE_PARAMS = {"database": "fake_db", "host": "fake_host", "port": 3306}
+
+
+class BuildDatabaseTestCase(TestCase):
+
+    def test_pymysql_driver(self):
+        database = build_database(FAKE_PARAMS, 'pymysql')
+        self.assertIsInstance(database, PooledPyMySQLDatabase)
+        self.assertEqual(database.database, "fake_db")
+        self.assertTrue(database.max_connections)
+        self.assertTrue(database.stale_timeout)
+
+    def test_mysqlclient_driver(self):
+        database = build_database(FAKE_PARAMS, 'mysqlclient')
+        self.assertNotIsInstance(database, PooledPyMySQLDatabase)
+        self.assertIsInstance(database, PooledMySQLDatabase)
+
+    @patch('host_provider.models.pymysql.connect')
+    def test_connect_with_pymysql(self, connect):
+        database = build_database(FAKE_PARAMS, 'pymysql')
+        self.assertIs(database.get_conn(), connect.return_value)
+        connect.assert_called_once_with(
+            db="fake_db", host="fake_host", port=3306,
+            charset='utf8', use_unicode=True
+        )
+
+    @patch('host_provider.models.pymysql.connect')
+    def test_connection_returned_to_pool(self, connect):
+        database = build_database(FAKE_PARAMS, 'pymysql')
+        conn = database.get_conn()
+        database.close()
+
+        self.assertEqual(database._in_use, {})
+        self.assertIs(database.get_conn(), conn)
+        connect.assert_called_once()
+
+
+class ReleaseDatabaseTestCase(TestCase):
+
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+
+    @patch('host_provider.main.mysql_db')
+    def test_close_after_request(self, mysql_db):
+        mysql_db.is_closed.return_value = False
+        self.app.get('/')
+        self.assertTrue(mysql_db.close.called)
+
+    @patch('host_provider.main.mysql_db')
+    def test_not_connected(self, mysql_db):
+        mysql_db.is_closed.return_value = True
+        self.app.get('/')
+        self.assertFalse(mysql_db.close.called)
+
+
+class IndexesTestCase(TestCase):
+
+    def test_migration_covers_model_indexes(self):
+        from host_provider.dbscripts.migrate import INDEXES
+        from host_provider.models import Host, IP
+
+        model_indexes = {
+            (model._meta.db_table, field.db_column)
+            for model in (Host, IP)
+            for field in model._fields_to_index()
+            if not isinstance(field, ForeignKeyField)
+        }
+        self.assertEqual(model_indexes, set(INDEXES))
@@ -1,4 +1,8 @@
 from unittest import TestCase
+from unittest.mock import patch
+
+from host_provider.credentials.base import zone_names
+from host_provider.credentials.gce import CredentialGce
 from host_provider.models import Host
 
 
@@ -29,3 +33,60 @@ class PropertiesTestCase(TestCase):
         self.assertIn('id', my_dict)
         self.assertIn('name', my_dict)
         self.assertNotIn('password', my_dict)
+
+
+@patch('host_provider.models.zone_names.load',
+       return_value={'fake_zone_id': 'fake_zone'})
+class ToDictTestCase(TestCase):
+
+    def setUp(self):
+        zone_names.clear()
+        self.host = Host(
+            id=11, name='fake_name', provider='gce', environment='dev',
+            zone='fake_zone_id'
+        )
+
+    def test_zone_name(self, load):
+        my_dict = self.host.to_dict
+        self.assertEqual(my_dict['zone_id'], 'fake_zone_id')
+        self.assertEqual(my_dict['zone'], 'fake_zone')
+        self.assertEqual(my_dict['name'], 'fake_name')
+        load.assert_called_once_with('gce', 'dev')
+
+    def test_zones_loaded_once(self, load):
+        self.host.to_dict
+        Host(provider='gce', environment='dev', zone='other_id').to_dict
+        self.assertEqual(load.call_count, 1)
+
+    def test_without_zone(self, load):
+        self.host.zone = ''
+        self.assertIsNone(self.host.to_dict['zone'])
+        self.assertFalse(load.called)
+
+    def test_unknown_zone(self, load):
+        self.host.zone = 'other_id'
+        self.assertIsNone(self.host.to_dict['zone'])
+
+    def test_exclude_password(self, load):
+        self.host._data['password'] = 123
+        self.assertNotIn('password', self.host.to_dict)
+        self.assertEqual(self.host._data['password'], 123)
+
+    def test_invalidate(self, load):
+        self.host.to_dict
+        zone_names.invalidate('gce', 'dev')
+        self.host.to_dict
+        self.assertEqual(load.call_count, 2)
+
+
+class ZoneNamesByIdTestCase(TestCase):
+
+    def test_zone_names_by_id(self):
+        credential = CredentialGce('gce', 'dev', None)
+        credential._content = {'availability_zones': {
+            'zone-a': {'id': 'id-a', 'name': 'zone-a', 'active': True},
+            'zone-b': {'id': 'id-b', 'name': 'zone-b', 'active': False},
+        }}
+        self.assertEqual(
+            credential.zone_names_by_id, {'id-a': 'zone-a', 'id-b': 'zone-b'}
+        )
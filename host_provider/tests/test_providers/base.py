@@ -1,10 +1,13 @@
 from unittest import TestCase
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 from collections import namedtuple
 from copy import deepcopy
 
 from libcloud import security
+from peewee import SqliteDatabase
+from playhouse.test_utils import test_database
 
+from host_provider.models import Host
 from host_provider.providers.base import ProviderBase
 from host_provider.providers import base, CloudStackProvider, GceProvider
 from host_provider.tests.test_credentials import CredentialAddFake, FakeMongoDB
@@ -98,12 +101,15 @@ class TestBaseProvider(TestCase):
             False
         )
 
-    def _add_credential(self, content, success_expected):
+    @patch('host_provider.credentials.base.new_version',
+           return_value='fake-version')
+    def _add_credential(self, content, success_expected, new_version):
         provider = FakeProvider(ENVIRONMENT, ENGINE)
 
         full_data = {
             "environment": ENVIRONMENT,
-            "provider": provider.get_provider()
+            "provider": provider.get_provider(),
+            "version": "fake-version"
         }
         full_data.update(content)
         self.assertNotIn(full_data, FakeMongoDB.metadata)
@@ -121,6 +127,29 @@ class TestBaseProvider(TestCase):
             self.assertNotIn(full_data, FakeMongoDB.metadata)
             self.assertEqual(FakeMongoDB.ids[-1], latest)
 
+    def test_create_host_given_zone(self):
+        provider = FakeProvider(ENVIRONMENT, ENGINE)
+        provider._credential = Mock()
+        provider._create_host = Mock(return_value="created")
+
+        self.assertEqual(
+            provider.create_host(1, 1024, "fake", "group", "zone"), "created"
+        )
+        self.assertEqual(provider.credential.zone, "zone")
+        provider.credential.before_create_host.assert_not_called()
+        provider.credential.after_create_host.assert_called_once_with("group")
+
+    def test_create_host_error_releases_zone(self):
+        provider = FakeProvider(ENVIRONMENT, ENGINE)
+        provider._credential = Mock()
+        provider._create_host = Mock(side_effect=Exception("Fake error"))
+
+        with self.assertRaises(Exception):
+            provider.create_host(1, 1024, "fake", "group", None)
+        provider.credential.before_create_host.assert_called_once_with("group")
+        provider.credential.release_zone.assert_called_once_with("group")
+        provider.credential.after_create_host.assert_not_called()
+
     @patch("host_provider.providers.base.get_driver", return_value="Fake")
     def test_get_driver(self, get_driver):
         provider = FakeProvider(ENVIRONMENT, ENGINE)
@@ -137,3 +166,85 @@ class TestBaseProvider(TestCase):
         self.assertNotEqual(security.CA_CERTS_PATH, "")
         ProviderBase(ENVIRONMENT, ENGINE)
         self.assertIsNone(security.CA_CERTS_PATH, None)
+
+
+class HostInfoTestCase(TestCase):
+
+    def setUp(self):
+        self.provider = FakeProvider(ENVIRONMENT, ENGINE)
+
+    def run(self, result=None):
+        with test_database(SqliteDatabase(':memory:'), [Host]):
+            for index in range(2):
+                Host(
+                    name='fake_name_{}'.format(index), group='fake_group',
+                    engine=ENGINE, environment=ENVIRONMENT, cpu=1,
+                    memory=1024, provider='fake', zone='fake_zone',
+                    identifier='fake_identifier_{}'.format(index),
+                    address='10.0.0.{}'.format(index)
+                ).save()
+            return super(HostInfoTestCase, self).run(result)
+
+    def test_host_ids_and_names(self):
+        self.assertEqual(
+            self.provider.get_host_ids('fake_group'),
+            ['fake_identifier_0', 'fake_identifier_1']
+        )
+        self.assertEqual(
+            self.provider.get_host_names('fake_group'),
+            ['fake_name_0', 'fake_name_1']
+        )
+        self.assertEqual(self.provider.get_host_ids('other_group'), [])
+
+    def test_hosts_info(self):
+        hosts = self.provider.get_hosts_info('fake_group')
+        self.assertEqual(len(hosts), 2)
+        self.assertEqual(hosts[0], {
+            'id': 1, 'identifier': 'fake_identifier_0',
+            'name': 'fake_name_0', 'address': '10.0.0.0', 'zone': 'fake_zone'
+        })
+
+    def test_hosts_info_fields(self):
+        hosts = self.provider.get_hosts_info('fake_group', ['id', 'name'])
+        self.assertEqual(hosts, [
+            {'id': 1, 'name': 'fake_name_0'}, {'id': 2, 'name': 'fake_name_1'}
+        ])
+
+    def test_hosts_info_invalid_fields(self):
+        with self.assertRaises(ValueError):
+            self.provider.get_hosts_info('fake_group', ['id', 'password'])
+
+
+class StatusesTestCase(TestCase):
+
+    def setUp(self):
+        self.provider = FakeProvider(ENVIRONMENT, ENGINE)
+        self.hosts = [
+            namedtuple('FakeHost', 'id name')(host_id, 'fake_name')
+            for host_id in range(1, 4)
+        ]
+
+    def test_check_each_host(self):
+        readiness = {1: (True, 'fake_version'), 2: (False, None)}
+
+        def is_ready(host):
+            if host.id not in readiness:
+                raise Exception('fake error')
+            return readiness[host.id]
+
+        with patch.object(FakeProvider, '_is_ready', side_effect=is_ready):
+            statuses = self.provider.get_statuses(self.hosts)
+
+        self.assertEqual(statuses, {
+            1: {'host_status': 'READY', 'version_id': 'fake_version'},
+            2: {'host_status': 'NOT READY', 'version_id': None},
+            3: {'error': 'fake error'},
+        })
+
+    def test_no_hosts(self):
+        self.assertEqual(self.provider.get_statuses([]), {})
+
+    def test_status_not_available(self):
+        with patch.object(FakeProvider, '_is_ready', return_value=None):
+            statuses = self.provider.get_statuses(self.hosts[:1])
+        self.assertIn('Status not available', statuses[1]['error'])
@@ -1,8 +1,33 @@
+import json
+import subprocess
+import sys
 from unittest import TestCase
-from host_provider.providers import get_provider_to
+from unittest.mock import patch
+from host_provider.main import app
+from host_provider.providers import get_provider_to, preload_providers, \
+    provider_name_of, PROVIDER_MODULES
+from host_provider.providers.base import ProviderBase
 from . import FakeProvider
 
 
+HEAVY_MODULES = (
+    'googleapiclient', 'google.oauth2', 'kubernetes',
+    'host_provider.providers.gce', 'host_provider.providers.k8s',
+    'host_provider.providers.azure', 'host_provider.providers.aws',
+    'host_provider.providers.cloudstack',
+)
+
+
+def modules_after_import(*imports):
+    code = (
+        "import sys, json\n"
+        "{}\n"
+        "print(json.dumps(sorted(sys.modules)))"
+    ).format("\n".join(imports))
+    output = subprocess.check_output([sys.executable, "-c", code])
+    return set(json.loads(output.decode("utf-8")))
+
+
 class TestFactory(TestCase):
 
     def test_no_provider(self):
@@ -13,3 +38,74 @@ class TestFactory(TestCase):
     def test_have_provider(self):
         provider = get_provider_to(FakeProvider.get_provider())
         self.assertEqual(provider.__name__, FakeProvider.__name__)
+
+    def test_registered_providers(self):
+        for provider_name in PROVIDER_MODULES:
+            provider = get_provider_to(provider_name)
+            self.assertIn(
+                provider_name,
+                (provider.get_provider(),) + provider.aliases
+            )
+
+    def test_aliases(self):
+        self.assertIs(get_provider_to('aws'), get_provider_to('ec2'))
+        self.assertIs(get_provider_to('azure'), get_provider_to('azure_arm'))
+        self.assertEqual(provider_name_of('aws'), 'ec2')
+        self.assertEqual(provider_name_of('fake'), 'fake')
+
+    def test_nested_subclass(self):
+        class NestedFakeProvider(FakeProvider):
+            aliases = ('nested_alias',)
+
+            @classmethod
+            def get_provider(cls):
+                return "NestedProviderForTests"
+
+        try:
+            self.assertIs(
+                get_provider_to("NestedProviderForTests"), NestedFakeProvider
+            )
+            self.assertIs(get_provider_to("nested_alias"), NestedFakeProvider)
+        finally:
+            ProviderBase.registry.pop("NestedProviderForTests")
+            ProviderBase.registry.pop("nested_alias")
+
+    @patch('host_provider.providers.get_provider_to')
+    def test_preload_providers(self, get_provider_to):
+        preload_providers(['gce'])
+        get_provider_to.assert_called_once_with('gce')
+
+        get_provider_to.reset_mock()
+        preload_providers(['all'])
+        self.assertEqual(get_provider_to.call_count, len(PROVIDER_MODULES))
+
+    def test_providers_endpoint(self):
+        resp = app.test_client().get('/providers')
+
+        self.assertEqual(resp.status_code, 200)
+        providers = {
+            provider['name']: provider['aliases']
+            for provider in json.loads(resp.data.decode("utf-8"))['providers']
+        }
+        self.assertEqual(providers['ec2'], ['aws'])
+        self.assertEqual(providers['azure_arm'], ['azure'])
+        self.assertEqual(providers['gce'], [])
+
+
+class ImportTimeTestCase(TestCase):
+    """
+        Importing the app must not pull in the providers (and their cloud
+        SDKs) before a request asks for them.
+    """
+
+    def test_app_import_is_lazy(self):
+        modules = modules_after_import("import host_provider.main")
+        self.assertEqual(modules.intersection(HEAVY_MODULES), set())
+
+    def test_provider_imported_on_first_use(self):
+        modules = modules_after_import(
+            "from host_provider.providers import get_provider_to",
+            "get_provider_to('k8s')"
+        )
+        self.assertIn('kubernetes', modules)
+        self.assertNotIn('googleapiclient', modules)
@@ -265,3 +265,32 @@ class TestCredentialAWS(TestCase):
         host.filter.assert_called_once_with(group=group)
         destroy.assert_called_once_with(identifier)
         all_node_destroyed.assert_called_once_with(group)
+
+    @patch(
+        'host_provider.providers.aws.CredentialAWS.get_content'
+    )
+    @patch(
+        'libcloud.compute.drivers.ec2.EC2NodeDriver.list_nodes'
+    )
+    def test_statuses_in_one_call(self, list_nodes, content):
+        self.build_credential_content(content)
+        list_nodes.return_value = [
+            MagicMock(id='i-1', state='running'),
+            MagicMock(id='i-2', state='stopped'),
+        ]
+        hosts = [
+            MagicMock(id=1, identifier='i-1'),
+            MagicMock(id=2, identifier='i-2'),
+            MagicMock(id=3, identifier='i-3'),
+        ]
+
+        statuses = self.provider.get_statuses(hosts)
+
+        list_nodes.assert_called_once_with(ex_node_ids=['i-1', 'i-2', 'i-3'])
+        self.assertEqual(
+            statuses[1], {'host_status': 'READY', 'version_id': 'i-1'}
+        )
+        self.assertEqual(
+            statuses[2], {'host_status': 'NOT READY', 'version_id': None}
+        )
+        self.assertIn('error', statuses[3])
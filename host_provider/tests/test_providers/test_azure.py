@@ -1,8 +1,16 @@
+import json
+from os import listdir, makedirs, path
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 from unittest.mock import MagicMock, patch, PropertyMock
 from libcloud.compute.types import Provider
+from host_provider.models import Host
 from host_provider.providers import AzureProvider
+from host_provider.providers.azure import NodeFoundError, DeployVmError, \
+    InvalidParameterError, JsonTemplates, TemplateNotFoundError, \
+    json_templates
 from host_provider.credentials.azure import CredentialAddAzure
+from host_provider.common.azure import vm_names
 
 ENVIRONMENT = "dev"
 ENGINE = "mssql"
@@ -21,3 +29,150 @@ class AzureTestCase(TestCase):
         self.assertEqual(
             self.provider.get_credential_add(), CredentialAddAzure
         )
+
+
+FAKE_AZURE_CREDENTIAL = {
+    "subscription_id": "fake_subscription",
+    "resource_group": "fake_group",
+}
+
+
+def fake_response(status_code=200, content=None):
+    response = MagicMock(status_code=status_code, ok=status_code < 400)
+    response.json.return_value = content
+    return response
+
+
+def fake_vm(name, vm_id):
+    return {"name": name, "properties": {"vmId": vm_id}}
+
+
+@patch('host_provider.providers.azure.CredentialAzure.get_content',
+       new=MagicMock(return_value=FAKE_AZURE_CREDENTIAL))
+@patch('host_provider.providers.azure.Host.get',
+       new=MagicMock(side_effect=Host.DoesNotExist))
+@patch('host_provider.providers.azure.AzureProvider._get')
+class AzureVmLookupTestCase(TestCase):
+
+    def setUp(self):
+        self.provider = AzureProvider(ENVIRONMENT, ENGINE)
+        vm_names.clear()
+
+    def test_get_vm_not_found(self, get):
+        get.return_value = fake_response(404)
+        self.assertIsNone(self.provider.get_vm("fakevm"))
+        self.assertIn("resourceGroups/fake_group/", get.call_args[0][0])
+        self.assertIn("/virtualMachines/fakevm?", get.call_args[0][0])
+
+    def test_get_node_stops_on_first_page(self, get):
+        get.side_effect = [fake_response(content={
+            "value": [fake_vm("vm1", "id1"), fake_vm("vm2", "id2")],
+            "nextLink": "https://fake/next"
+        })]
+        self.assertEqual(self.provider.get_node("id2"), {"vmId": "id2"})
+        self.assertEqual(get.call_count, 1)
+
+    def test_get_node_follows_next_link(self, get):
+        get.side_effect = [
+            fake_response(content={
+                "value": [fake_vm("vm1", "id1")],
+                "nextLink": "https://fake/next"
+            }),
+            fake_response(content={"value": [fake_vm("vm2", "id2")]}),
+        ]
+        self.assertEqual(self.provider.get_node("id2"), {"vmId": "id2"})
+        self.assertEqual(get.call_args[0][0], "https://fake/next")
+
+    def test_get_node_not_found(self, get):
+        get.return_value = fake_response(content={"value": []})
+        with self.assertRaises(NodeFoundError):
+            self.provider.get_node("id1")
+
+    def test_get_node_list_error(self, get):
+        get.return_value = fake_response(503)
+        with self.assertRaisesRegex(NodeFoundError, "Could not list vms"):
+            self.provider.get_node("id1")
+
+    def test_get_node_by_indexed_name(self, get):
+        vm_names["id1"] = "vm1"
+        get.return_value = fake_response(content=fake_vm("vm1", "id1"))
+        self.assertEqual(self.provider.get_node("id1"), {"vmId": "id1"})
+        get.assert_called_once()
+        self.assertIn("/virtualMachines/vm1?", get.call_args[0][0])
+
+    def test_deploy_existing_vm(self, get):
+        get.return_value = fake_response(content=fake_vm("vm1", "id1"))
+        with self.assertRaises(DeployVmError):
+            self.provider.deploy_vm("vm1", {"name": "Standard_B1s"})
+        self.assertEqual(vm_names["id1"], "vm1")
+
+
+class JsonTemplatesTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.write("1.0.0", "nic", {"properties": {"ipConfigurations": []}})
+        self.write("2.0.0", "nic", {"properties": {"enable": True}})
+        self.templates = JsonTemplates(path=self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, version, name, content):
+        folder = path.join(self.tmp_dir.name, version, "networkInterfaces")
+        makedirs(folder, exist_ok=True)
+        with open(path.join(folder, name + ".json"), "w") as fp:
+            json.dump(content, fp)
+
+    def test_versions_side_by_side(self):
+        self.assertEqual(self.templates.versions, ["1.0.0", "2.0.0"])
+        self.assertEqual(
+            self.templates.get("nic", "2.0.0"),
+            {"properties": {"enable": True}}
+        )
+
+    def test_load_once(self):
+        with patch.object(
+            JsonTemplates, 'load_json', wraps=self.templates.load_json
+        ) as load_json:
+            self.templates.get("nic", "1.0.0")
+            self.templates.get("nic", "1.0.0")
+        self.assertEqual(load_json.call_count, 2)
+
+    def test_get_returns_copy(self):
+        template = self.templates.get("nic", "1.0.0")
+        template["properties"]["ipConfigurations"].append({"name": "fake"})
+        self.assertEqual(
+            self.templates.get("nic", "1.0.0")["properties"],
+            {"ipConfigurations": []}
+        )
+
+    def test_not_found(self):
+        with self.assertRaises(TemplateNotFoundError):
+            self.templates.get("sql", "1.0.0")
+        with self.assertRaises(TemplateNotFoundError):
+            self.templates.get("nic", "3.0.0")
+
+    def test_invalid_template(self):
+        self.write("1.5.0", "sql", {"location": "fake"})
+        with self.assertRaises(InvalidParameterError):
+            self.templates.load()
+        with self.assertRaises(InvalidParameterError):
+            self.templates.get("nic", "2.0.0")
+        self.assertEqual(self.templates._templates, {})
+
+    def test_empty_folder_loaded_once(self):
+        templates = JsonTemplates(path=path.join(self.tmp_dir.name, "empty"))
+        makedirs(templates.path)
+        with patch('host_provider.providers.azure.os.listdir',
+                   wraps=listdir) as fake_listdir:
+            self.assertEqual(templates.versions, [])
+            self.assertEqual(templates.versions, [])
+        self.assertEqual(fake_listdir.call_count, 1)
+
+    def test_packaged_templates(self):
+        self.assertIn("1.0.0", json_templates.versions)
+        self.assertIn(
+            "ipConfigurations",
+            json_templates.get("nic", "1.0.0")["properties"]
+        )
@@ -0,0 +1,109 @@
+from unittest import TestCase
+
+from host_provider.providers.cache import ProviderCache
+from host_provider.tests.test_credentials import CredentialBaseFake
+from .base import FakeProvider, ENVIRONMENT, ENGINE
+
+
+class CachedFakeProvider(FakeProvider):
+
+    version = "first"
+
+    @classmethod
+    def get_provider(cls):
+        return "CachedProviderForTests"
+
+    def build_client(self):
+        return object()
+
+    def build_credential(self):
+        return CredentialBaseFake(
+            self.get_provider(), self.environment, self.engine
+        )
+
+    @property
+    def credential_version(self):
+        return self.version
+
+
+class UnpooledFakeProvider(CachedFakeProvider):
+
+    pool_clients = False
+
+
+class ProviderCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.cache = ProviderCache(maxsize=2, ttl=60, max_idle_clients=1)
+
+    def tearDown(self):
+        CachedFakeProvider.version = "first"
+
+    def build(self, environment=ENVIRONMENT, engine=ENGINE):
+        return self.cache.build(CachedFakeProvider, environment, engine)
+
+    def test_client_reused_after_release(self):
+        first = self.build()
+        client = first.client
+        self.assertIsNot(self.build().client, client)
+
+        first.release()
+        self.assertIsNone(first._client)
+        self.assertIs(self.build().client, client)
+
+    def test_clients_dropped_on_new_version(self):
+        first = self.build()
+        client = first.client
+        old = self.build()
+        old_client = old.client
+        first.release()
+
+        CachedFakeProvider.version = "second"
+        second = self.build()
+        new_client = second.client
+        self.assertIsNot(new_client, client)
+
+        old.release()
+        second.release()
+        self.assertIs(self.build().client, new_client)
+        self.assertIsNot(self.build().client, old_client)
+
+    def test_client_not_shared_while_in_use(self):
+        first = self.build()
+        second = self.build()
+        self.assertIsNot(first.client, second.client)
+
+    def test_invalidate_environment(self):
+        entry = self.build().cache_entry
+        other = self.build(environment="prod").cache_entry
+
+        self.cache.invalidate(CachedFakeProvider.get_provider(), ENVIRONMENT)
+
+        self.assertIsNot(self.build().cache_entry, entry)
+        self.assertIs(self.build(environment="prod").cache_entry, other)
+
+    def test_invalidate_provider(self):
+        self.build()
+        self.build(environment="prod")
+        self.cache.invalidate(CachedFakeProvider.get_provider())
+        self.assertEqual(len(self.cache), 0)
+
+    def test_size_bounded(self):
+        self.build(engine="redis")
+        self.build(engine="mongodb")
+        self.build(engine="mysql")
+        self.assertEqual(len(self.cache), 2)
+
+    def test_provider_without_cache(self):
+        provider = CachedFakeProvider(ENVIRONMENT, ENGINE)
+        self.assertIsNone(provider.cache_entry)
+
+    def test_clients_not_pooled(self):
+        first = self.cache.build(UnpooledFakeProvider, ENVIRONMENT, ENGINE)
+        client = first.client
+        first.release()
+
+        second = self.cache.build(UnpooledFakeProvider, ENVIRONMENT, ENGINE)
+        self.assertIsNone(second.cache_entry)
+        self.assertIsNot(second.client, client)
+        self.assertEqual(len(self.cache), 0)
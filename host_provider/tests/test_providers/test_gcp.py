@@ -3,12 +3,15 @@ from unittest.mock import patch, MagicMock, PropertyMock
 from peewee import DoesNotExist
 from googleapiclient.errors import HttpError
 
-from .base import GCPBaseTestCase
+from .base import GCPBaseTestCase, ENVIRONMENT
 from .fakes.gce import (FAKE_GCE_CREDENTIAL,
                         FAKE_STATIC_IP,
                         FAKE_GOOGLE_RESPONSE_STATIC_IP, FAKE_SA)
 from .fakes.base import FAKE_ENGINE, FAKE_HOST, FAKE_TAGS
-from host_provider.providers.gce import StaticIPNotFoundError, WrongStatusError
+from host_provider.providers.gce import StaticIPNotFoundError, \
+    WrongStatusError, GceProvider
+from host_provider.common.gce import image_links
+from host_provider.providers.cache import ProviderCache
 
 
 @patch('dbaas_base_provider.baseProvider.BaseProvider.wait_operation')
@@ -77,6 +80,11 @@ class ResourceFoundTestCase(GCPBaseTestCase):
     def test_create_host_is_not_called(self, client_mock, wait_op, get_or_none):
         self.provider.credential._zone = 'fake_zone_1'
         insert_mock = client_mock().instances().insert
+        client_mock().instances().aggregatedList().execute.return_value = {
+            'items': {
+                'zones/fake_zone_1': {'instances': [{'name': 'fake_name'}]}
+            }
+        }
         self.provider._create_host(
             2, 1024, 'fake_name', static_ip_id='fake_static_ip_id'
         )
@@ -102,6 +110,33 @@ class ResourceFoundTestCase(GCPBaseTestCase):
        new=MagicMock(return_value={'cliente': 'x'}))
 class CreateHostTestCase(GCPBaseTestCase):
 
+    def test_instance_found_in_another_zone(self, client_mock, wait_op):
+        self.build_credential_content(
+            self.provider.credential.get_content,
+            availability_zones={
+                'fake_zone_1': {'active': True, 'id': 'fake_zone_1',
+                                'name': 'fake_zone_1'},
+                'fake_zone_2': {'active': True, 'id': 'fake_zone_2',
+                                'name': 'fake_zone_2'},
+            }
+        )
+        list_mock = client_mock().instances().aggregatedList
+        list_mock().execute.return_value = {
+            'items': {
+                'zones/unknown_zone': {'instances': [{'name': 'fake_name'}]},
+                'zones/fake_zone_1': {'warning': {'code': 'NO_RESULTS'}},
+                'zones/fake_zone_2': {'instances': [{'name': 'fake_name'}]},
+            }
+        }
+
+        zone, instance = self.provider.find_instance('fake_name')
+
+        self.assertEqual(zone, 'fake_zone_2')
+        self.assertEqual(instance, {'name': 'fake_name'})
+        self.assertEqual(
+            list_mock.call_args[1]['filter'], 'name = "fake_name"'
+        )
+
     def test_static_ip_not_found(self, client_mock, wait_op):
         with self.assertRaises(StaticIPNotFoundError):
             self.provider._create_host(2, 1024, 'fake_name')
@@ -340,8 +375,8 @@ class WaitStatusOfTestCase(GCPBaseTestCase):
 
     def setUp(self):
         super(WaitStatusOfTestCase, self).setUp()
-        self.provider.WAIT_ATTEMPTS = 3
-        self.provider.WAIT_TIME = 0
+        self.provider.DESTROY_WAIT_TIMEOUT = 0
+        self.provider.ROLE_WAIT_TIMEOUT = 0
         self.fake_request = MagicMock()
         self.fake_request.execute.return_value = {
             'status': 'READY',
@@ -433,3 +468,113 @@ class ServiceAccountTestCase(GCPBaseTestCase):
         )
 
         self.assertTrue(add_role_to_sa.called)
+
+
+@patch('host_provider.providers.gce.GceProvider.build_service')
+@patch('host_provider.providers.gce.CredentialGce.get_content',
+       new=MagicMock(return_value=FAKE_GCE_CREDENTIAL))
+class ServiceClientsTestCase(GCPBaseTestCase):
+
+    def test_service_built_once(self, build_service):
+        iam = self.provider.get_iam_service_client()
+        self.assertIs(self.provider.get_iam_service_client(), iam)
+        build_service.assert_called_once_with('iam', 'v1')
+
+    def test_service_per_api(self, build_service):
+        self.provider.get_pubsub_service_client()
+        self.provider.get_resource_manager_service_client()
+        self.provider.get_cloudidentity_service_client()
+        self.assertEqual(build_service.call_count, 3)
+
+    def test_service_pooled_across_requests(self, build_service):
+        build_service.side_effect = lambda name, version: object()
+        cache = ProviderCache(max_idle_clients=1)
+        first = cache.build(GceProvider, ENVIRONMENT, FAKE_ENGINE)
+        iam = first.get_iam_service_client()
+        self.assertIsNot(
+            cache.build(GceProvider, ENVIRONMENT, FAKE_ENGINE)
+            .get_iam_service_client(), iam
+        )
+
+        first.release()
+        second = cache.build(GceProvider, ENVIRONMENT, FAKE_ENGINE)
+        self.assertIs(second.get_iam_service_client(), iam)
+        self.assertEqual(build_service.call_count, 2)
+
+
+@patch('host_provider.providers.gce.GceProvider.build_client')
+@patch('host_provider.providers.gce.CredentialGce.get_content',
+       new=MagicMock(return_value=FAKE_GCE_CREDENTIAL))
+class ResourceMemoTestCase(GCPBaseTestCase):
+
+    def setUp(self):
+        super(ResourceMemoTestCase, self).setUp()
+        image_links.clear()
+
+    def test_instance_fetched_once(self, client_mock):
+        get_mock = client_mock().instances().get
+        get_mock().execute.return_value = {'name': 'fake_instance_name'}
+        get_mock.reset_mock()
+
+        for _ in range(2):
+            self.provider.get_instance('fake_instance_name', 'fake_zone')
+        get_mock().execute.assert_called_once_with()
+
+    @patch('host_provider.providers.gce.Host')
+    def test_found_instance_reused(self, host_mock, client_mock):
+        instance = {
+            'name': 'fake_name',
+            'networkInterfaces': [{'networkIP': '10.0.0.1'}]
+        }
+        client_mock().instances().aggregatedList().execute.return_value = {
+            'items': {'zones/fake_zone_1': {'instances': [instance]}}
+        }
+        client_mock().instances().get.reset_mock()
+        self.provider.credential._zone = 'fake_zone_1'
+
+        self.provider.find_instance('fake_name')
+        self.provider.create_host_object(
+            self.provider, {
+                'name': 'fake_name', 'group': 'fake_group',
+                'engine': 'fake_engine', 'cpu': 1, 'memory': 1024
+            }, ENVIRONMENT, {'id': 'fake_id'}, 'fake_static_ip_id'
+        )
+
+        self.assertEqual(host_mock.call_args[1]['address'], '10.0.0.1')
+        self.assertFalse(client_mock().instances().get.called)
+
+    @patch('host_provider.providers.gce.operation_waiter')
+    def test_operation_clears_resources(self, waiter, client_mock):
+        get_mock = client_mock().instances().get
+        get_mock.reset_mock()
+        self.provider.get_instance('fake_instance_name', 'fake_zone')
+
+        self.provider._wait('fake_operation', zone='fake_zone')
+
+        self.assertEqual(len(self.provider.resources), 0)
+        self.provider.get_instance('fake_instance_name', 'fake_zone')
+        self.assertEqual(get_mock().execute.call_count, 2)
+
+    def test_missing_address_not_kept(self, client_mock):
+        with patch.object(
+            self.provider, 'get_or_none_resource', return_value=None
+        ) as get_or_none:
+            self.provider.get_static_ip_detail('fake_ip')
+            self.provider.get_static_ip_detail('fake_ip')
+        self.assertEqual(get_or_none.call_count, 2)
+
+    def test_image_link_shared_between_requests(self, client_mock):
+        images_mock = client_mock().images().get
+        images_mock().execute.return_value = {'selfLink': 'fake_link'}
+        images_mock.reset_mock()
+
+        for _ in range(2):
+            provider = GceProvider(ENVIRONMENT, 'mongodb_3_4_1')
+            self.build_credential_content(
+                provider.credential.get_content,
+                template_project='fake_template_project'
+            )
+            self.assertEqual(provider.disk_image_link, 'fake_link')
+        images_mock.assert_called_once_with(
+            project='fake_template_project', image='fake_template_mongo_3_4_1'
+        )
@@ -0,0 +1,155 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from host_provider.providers.k8s import K8sProvider, \
+    build_template_environment, template_environment
+
+
+ENVIRONMENT = "dev"
+ENGINE = "mongodb"
+FAKE_AUTH_INFO = {
+    'K8S-Token': 'fake_token',
+    'K8S-Endpoint': 'https://fake.k8s',
+    'K8S-Namespace': 'fake_namespace',
+}
+
+
+def fake_pod(name, ready):
+    pod = MagicMock()
+    pod.metadata.name = name
+    pod.metadata.uid = '{}-uid'.format(name)
+    pod.status.conditions = [MagicMock(type='Ready', status=str(ready))]
+    return pod
+
+
+def fake_host(host_id, name, group):
+    host = MagicMock(id=host_id, group=group)
+    host.name = name
+    return host
+
+
+@patch('host_provider.providers.k8s.K8sProvider.build_client')
+class StatusesTestCase(TestCase):
+
+    def setUp(self):
+        self.provider = K8sProvider(ENVIRONMENT, ENGINE)
+        self.provider.auth_info = FAKE_AUTH_INFO
+
+    def test_pods_by_label_selector(self, client_mock):
+        list_pods = client_mock().list_namespaced_pod
+        list_pods.return_value.items = [
+            fake_pod('db-1-0', True), fake_pod('db-2-0', False)
+        ]
+        hosts = [
+            fake_host(1, 'db-1-0', 'group-b'),
+            fake_host(2, 'db-2-0', 'group-a'),
+            fake_host(3, 'db-3-0', 'group-a'),
+        ]
+
+        statuses = self.provider.get_statuses(hosts)
+
+        list_pods.assert_called_once_with(
+            'fake_namespace', label_selector='name in (group-a,group-b)'
+        )
+        self.assertEqual(statuses, {
+            1: {'host_status': 'READY', 'version_id': 'db-1-0-uid'},
+            2: {'host_status': 'NOT READY', 'version_id': None},
+            3: {'host_status': 'NOT READY', 'version_id': None},
+        })
+
+
+class TemplatesTestCase(TestCase):
+
+    def setUp(self):
+        self.provider = K8sProvider(ENVIRONMENT, ENGINE)
+
+    def test_template_compiled_once(self):
+        with patch.object(
+            template_environment.loader, 'get_source',
+            wraps=template_environment.loader.get_source
+        ) as get_source:
+            template_environment.cache.clear()
+            for name in ('fake-1', 'fake-2'):
+                self.provider.yaml_file(
+                    'namespace.yaml', {'NAME': name, 'PROJECT_ID': 'fake'}
+                )
+        get_source.assert_called_once()
+
+    def test_yaml_file(self):
+        service = self.provider.yaml_file('service.yaml', {
+            'SERVICE_NAME': 'fake_service', 'LABEL_NAME': 'fake_group',
+            'PORTS': [27017, 27018], 'POOL_DOMAIN': 'fake.domain',
+        })
+
+        self.assertEqual(service['metadata']['name'], 'fake_service')
+        self.assertEqual(service['spec']['selector'], {'name': 'fake_group'})
+        self.assertEqual(
+            [port['port'] for port in service['spec']['ports']],
+            [27017, 27018]
+        )
+
+    def test_bytecode_cache(self):
+        with TemporaryDirectory() as cache_dir:
+            environment = build_template_environment(cache_dir)
+            environment.get_template('namespace.yaml')
+            self.assertTrue(os.listdir(cache_dir))
+
+
+@patch('host_provider.providers.k8s.K8S_POD_INFORMER', new=True)
+@patch('host_provider.providers.k8s.pod_informers')
+@patch('host_provider.providers.k8s.K8sProvider.build_client')
+class PodInformerTestCase(TestCase):
+
+    def setUp(self):
+        self.provider = K8sProvider(ENVIRONMENT, ENGINE)
+        self.provider.auth_info = FAKE_AUTH_INFO
+        self.cached = {'db-1-0': fake_pod('db-1-0', True)}
+
+    def use_informer(self, pod_informers):
+        pod_informers.get.return_value.get.side_effect = self.cached.get
+
+    def test_status_from_memory(self, client_mock, pod_informers):
+        self.use_informer(pod_informers)
+        status = self.provider.get_status(fake_host(1, 'db-1-0', 'group-a'))
+
+        self.assertEqual(status, ('READY', 'db-1-0-uid'))
+        self.assertFalse(client_mock().read_namespaced_pod_status.called)
+        pod_informers.get.assert_called_with(
+            'https://fake.k8s', 'fake_namespace', FAKE_AUTH_INFO['K8S-Token'],
+            self.provider.build_client
+        )
+
+    def test_list_only_missing(self, client_mock, pod_informers):
+        self.use_informer(pod_informers)
+        list_pods = client_mock().list_namespaced_pod
+        list_pods.return_value.items = [fake_pod('db-2-0', True)]
+        hosts = [
+            fake_host(1, 'db-1-0', 'group-a'),
+            fake_host(2, 'db-2-0', 'group-b'),
+        ]
+
+        statuses = self.provider.get_statuses(hosts)
+
+        list_pods.assert_called_once_with(
+            'fake_namespace', label_selector='name in (group-b)'
+        )
+        self.assertEqual(statuses[1]['host_status'], 'READY')
+        self.assertEqual(statuses[2]['host_status'], 'READY')
+
+    def test_nothing_listed_when_cached(self, client_mock, pod_informers):
+        self.use_informer(pod_informers)
+        self.provider.get_statuses([fake_host(1, 'db-1-0', 'group-a')])
+        self.assertFalse(client_mock().list_namespaced_pod.called)
+
+    def test_fallback_to_api(self, client_mock, pod_informers):
+        self.use_informer(pod_informers)
+        read_pod = client_mock().read_namespaced_pod
+        read_pod.return_value.status.pod_ip = '10.0.0.2'
+        host = fake_host(2, 'db-2-0', 'group-a')
+
+        self.provider._refresh_metadata(host)
+
+        read_pod.assert_called_once_with('db-2-0', 'fake_namespace')
+        self.assertEqual(host.address, '10.0.0.2')